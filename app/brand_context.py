@@ -0,0 +1,146 @@
+# brand_context.py
+import os
+import re
+import math
+import logging
+from collections import Counter
+from typing import Dict, List
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # optional; tokens are then estimated from length
+    _encoding = None
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens a crawl's brand context may use, headers included
+BRAND_CONTEXT_TOKEN_BUDGET = int(os.getenv("BRAND_CONTEXT_TOKEN_BUDGET", "600"))
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-zA-ZÀ-ɏ][a-zA-ZÀ-ɏ'-]+")
+# Cookie banners, consent prompts and legal footers that survive tag stripping.
+# Whole banner phrases only: product copy may well mention cookies or JavaScript.
+_BOILERPLATE = re.compile(
+    r"\b(we use cookies|this (web)?site uses cookies|(accept|allow|reject|manage) (all )?cookies|"
+    r"cookie (policy|settings|preferences)|by (continuing|clicking|using)[^.!?]{0,60}you (agree|consent)|"
+    r"(enable|turn on) javascript|javascript (is )?(required|disabled)|"
+    r"privacy policy|terms of (service|use)|all rights reserved|"
+    r"sign up for our newsletter|subscribe to our newsletter|skip to (main )?content)\b",
+    re.IGNORECASE
+)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this to "
+    "we with you your will can all more than also into about us they them was were been".split()
+)
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, otherwise ~4 characters per token"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def _fingerprint(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _sentences(text: str, max_words: int = 40) -> List[str]:
+    """Split into sentences, chunking unpunctuated runs so they can still be ranked"""
+    sentences = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            sentences.append(" ".join(words[start:start + max_words]))
+    return sentences
+
+
+def _content_words(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def build_brand_context(pages: List[Dict], token_budget: int = BRAND_CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Compress crawled pages into a brand context that fits a token budget.
+
+    Page headers (URL, title, description, main headings) come first.
+    Sentences repeated across pages or matching common boilerplate are
+    dropped, the rest are ranked by how many distinctive words they carry
+    (earlier and home page sentences slightly favoured), and the best ones
+    that fit the budget are kept in their original order.
+    """
+    headers: List[List[str]] = []
+    seen_headings = set()
+    for i, page in enumerate(pages):
+        lines = ["=== HOME PAGE ===" if i == 0 else f"\n=== PAGE {i} ===", f"URL: {page['url']}"]
+        if page['title']:
+            lines.append(f"Title: {page['title']}")
+        if page['meta_description']:
+            lines.append(f"Description: {page['meta_description']}")
+
+        # Headings repeated on every page (site name, nav labels) are only listed once
+        headings = [h for h in page['headings']['h1'][:3] if _fingerprint(h) not in seen_headings]
+        seen_headings.update(_fingerprint(h) for h in headings)
+        if headings:
+            lines.append(f"Main Headings: {', '.join(headings)}")
+        headers.append(lines)
+
+    used = count_tokens("\n".join(line for lines in headers for line in lines))
+
+    page_sentences = [_sentences(page['text_content']) for page in pages]
+
+    # A sentence on more than one page is navigation or footer text
+    page_counts = Counter()
+    for sentences in page_sentences:
+        page_counts.update({_fingerprint(sentence) for sentence in sentences})
+
+    candidates = []
+    kept = set()
+    for page_index, sentences in enumerate(page_sentences):
+        for position, sentence in enumerate(sentences):
+            key = _fingerprint(sentence)
+            words = _content_words(sentence)
+            if (
+                len(words) < 3
+                or key in kept
+                or (len(pages) > 1 and page_counts[key] > 1)
+                or _BOILERPLATE.search(sentence)
+            ):
+                continue
+            kept.add(key)
+            candidates.append((page_index, position, sentence, words))
+
+    # Words that occur in few sentences say the most about this brand
+    document_frequency = Counter()
+    for *_, words in candidates:
+        document_frequency.update(set(words))
+    total = max(len(candidates), 1)
+
+    def score(candidate) -> float:
+        page_index, position, _, words = candidate
+        informativeness = sum(math.log(1 + total / document_frequency[word]) for word in set(words))
+        informativeness /= math.sqrt(len(words))
+        return informativeness / (1 + 0.02 * position) * (1.2 if page_index == 0 else 1.0)
+
+    selected = set()
+    for candidate in sorted(candidates, key=score, reverse=True):
+        cost = count_tokens(candidate[2]) + 1
+        if used + cost > token_budget:
+            continue
+        used += cost
+        selected.add((candidate[0], candidate[1]))
+
+    parts = []
+    for page_index, lines in enumerate(headers):
+        parts.extend(lines)
+        content = [
+            sentence for p, position, sentence, _ in candidates
+            if p == page_index and (p, position) in selected
+        ]
+        if content:
+            parts.append(f"Content:\n{' '.join(content)}")
+
+    context = "\n".join(parts)
+    logger.info(f"Brand context: {len(selected)}/{len(candidates)} sentences, ~{used} tokens")
+    return context
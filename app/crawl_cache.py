@@ -0,0 +1,122 @@
+# crawl_cache.py
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse, urlencode, parse_qsl
+
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CRAWL_CACHE_TTL_SECONDS = int(os.getenv("CRAWL_CACHE_TTL_SECONDS", "86400"))
+CRAWL_CACHE_MAX_ENTRIES = int(os.getenv("CRAWL_CACHE_MAX_ENTRIES", "512"))
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings share a cache entry"""
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+
+    path = parsed.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+
+    return f"{scheme}://{host}{path}" + (f"?{query}" if query else "")
+
+
+class CrawlCache:
+    """
+    Crawl results keyed by normalized URL and inner page count.
+
+    An in-process LRU sits in front of a persistent store. Entries older than
+    the TTL are stale: the crawler revalidates them with a conditional request
+    on the home page before deciding to crawl again.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = CRAWL_CACHE_TTL_SECONDS,
+        max_entries: int = CRAWL_CACHE_MAX_ENTRIES,
+        load: Optional[Callable[[str], Awaitable[Optional[Dict]]]] = None,
+        save: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.memory = TTLCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+        self.load = load
+        self.save = save
+        self.counters = {"hits": 0, "store_hits": 0, "revalidated": 0, "misses": 0}
+
+    @staticmethod
+    def key(base_url: str, max_inner_pages: int) -> str:
+        return f"{normalize_url(base_url)}|{max_inner_pages}"
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return datetime.utcnow() - entry["validated_at"] < self.ttl
+
+    async def get(self, base_url: str, max_inner_pages: int) -> Optional[Dict]:
+        """Return the cached entry, fresh or stale, or None on a miss"""
+        key = self.key(base_url, max_inner_pages)
+
+        entry = self.memory.get(key)
+        if entry and self.is_fresh(entry):
+            self.counters["hits"] += 1
+            return entry
+
+        if self.load:
+            try:
+                entry = await self.load(key)
+            except Exception as e:
+                logger.warning(f"Crawl cache lookup failed: {str(e)}")
+                entry = None
+
+        if not entry:
+            self.counters["misses"] += 1
+            return None
+
+        if self.is_fresh(entry):
+            self.counters["store_hits"] += 1
+            self.memory.set(key, entry)
+        return entry
+
+    async def set(self, base_url: str, max_inner_pages: int, context: str, etag: str = None, last_modified: str = None) -> Dict:
+        """Store a freshly crawled result"""
+        now = datetime.utcnow()
+        entry = {
+            "_id": self.key(base_url, max_inner_pages),
+            "url": base_url,
+            "max_inner_pages": max_inner_pages,
+            "context": context,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": now,
+            "validated_at": now
+        }
+        await self._store(entry)
+        return entry
+
+    async def mark_revalidated(self, entry: Dict) -> None:
+        """Extend a stale entry after the origin answered 304 Not Modified"""
+        self.counters["revalidated"] += 1
+        entry["validated_at"] = datetime.utcnow()
+        await self._store(entry)
+
+    async def _store(self, entry: Dict) -> None:
+        self.memory.set(entry["_id"], entry)
+        if self.save:
+            try:
+                await self.save(entry)
+            except Exception as e:
+                logger.warning(f"Crawl cache write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "memory_size": len(self.memory)}
@@ -1,157 +1,328 @@
 # crawler.py
-import requests
+import asyncio
+import httpx
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from app.crawl_cache import CrawlCache
+from app.brand_context import BRAND_CONTEXT_TOKEN_BUDGET, build_brand_context
+import importlib.util
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-def crawl_website(self, base_url: str, max_inner_pages: int = 2) -> Optional[str]:
-    """
-    Crawl website and return brand context string for LLM
-    
-    Args:
-        base_url: The website homepage URL
-        max_inner_pages: Number of inner pages to crawl
-    
-    Returns:
-        String with brand context, or None if crawl fails
-    """
-    print(f"\n[CRAWLER] crawl_website called with: {base_url}", flush=True)
-    logger.info(f"[CRAWLER] Starting crawl of {base_url}")
-    
-    try:
-        pages_data = []
-        
-        # Crawl home page
-        print(f"[CRAWLER] Fetching home page: {base_url}", flush=True)
-        logger.info(f"Crawling: {base_url}")
-        home_data = self._fetch_page_data(base_url)
-        
-        print(f"[CRAWLER] Home page fetch result: {home_data is not None}", flush=True)
-        
-        if not home_data:
-            print(f"[CRAWLER] Home page fetch failed, returning None", flush=True)
-            logger.warning("Failed to crawl home page")
-            return None
-        
-        print(f"[CRAWLER] Home page title: {home_data.get('title')}", flush=True)
-        pages_data.append(home_data)
-        
-        # Extract and crawl inner pages
-        try:
-            inner_links = self._extract_internal_links(base_url, home_data["html"])
-            print(f"[CRAWLER] Found {len(inner_links)} inner links", flush=True)
-            
-            for link in inner_links[:max_inner_pages]:
-                try:
-                    print(f"[CRAWLER] Crawling inner page: {link}", flush=True)
-                    logger.info(f"Crawling inner page: {link}")
-                    page_data = self._fetch_page_data(link)
-                    if page_data:
-                        pages_data.append(page_data)
-                        print(f"[CRAWLER] Inner page added: {page_data.get('title')}", flush=True)
-                except Exception as e:
-                    print(f"[CRAWLER] Inner page failed: {str(e)}", flush=True)
-                    logger.warning(f"Failed to crawl {link}: {str(e)}")
-                    continue
-        except Exception as e:
-            print(f"[CRAWLER] Link extraction failed: {str(e)}", flush=True)
-            logger.warning(f"Failed to extract inner links: {str(e)}")
-        
-        # Build and return brand context
-        print(f"[CRAWLER] Building context from {len(pages_data)} pages", flush=True)
-        brand_context = self._build_brand_context(pages_data)
-        print(f"[CRAWLER] Brand context length: {len(brand_context)}", flush=True)
-        logger.info(f"✓ Crawled {len(pages_data)} pages successfully")
-        return brand_context
-        
-    except Exception as e:
-        print(f"[CRAWLER] Exception in crawl_website: {str(e)}", flush=True)
-        logger.error(f"Crawl failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return None
+# Total time budget for one crawl, and how many inner pages are fetched at once
+CRAWL_DEADLINE_SECONDS = float(os.getenv("CRAWL_DEADLINE_SECONDS", "12"))
+CRAWL_MAX_CONCURRENCY = int(os.getenv("CRAWL_MAX_CONCURRENCY", "4"))
+
+# Connection pool shape and the most bytes read from any single page
+CRAWL_MAX_CONNECTIONS = int(os.getenv("CRAWL_MAX_CONNECTIONS", "50"))
+CRAWL_MAX_CONNECTIONS_PER_HOST = int(os.getenv("CRAWL_MAX_CONNECTIONS_PER_HOST", "4"))
+CRAWL_MAX_PAGE_BYTES = int(os.getenv("CRAWL_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+
+# HTML backend: "auto", "selectolax", "lxml" or "html.parser"
+CRAWLER_HTML_PARSER = os.getenv("CRAWLER_HTML_PARSER", "auto")
+
+NON_CONTENT_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript']
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Returned by _fetch_page_data when a conditional request answers 304
+NOT_MODIFIED = object()
+
+# Links with these extensions are never HTML, so they are not worth a request
+NON_HTML_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.zip',
+    '.gz', '.mp3', '.mp4', '.mov', '.avi', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'
+)
+
+
+def _resolve_parser(name: str) -> str:
+    """Pick the fastest installed HTML backend unless one is configured"""
+    if name != "auto":
+        return name
+    for candidate in ("selectolax", "lxml"):
+        if importlib.util.find_spec(candidate):
+            return candidate
+    return "html.parser"
+
 
 class WebCrawler:
-    def __init__(self):
+    def __init__(
+        self,
+        deadline_seconds: float = CRAWL_DEADLINE_SECONDS,
+        max_concurrency: int = CRAWL_MAX_CONCURRENCY,
+        cache: Optional[CrawlCache] = None,
+        parser: str = CRAWLER_HTML_PARSER,
+        max_page_bytes: int = CRAWL_MAX_PAGE_BYTES,
+        context_token_budget: int = BRAND_CONTEXT_TOKEN_BUDGET
+    ):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        self.deadline_seconds = deadline_seconds
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.parser = _resolve_parser(parser)
+        self.max_page_bytes = max_page_bytes
+        self.context_token_budget = context_token_budget
+        self._http: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, creating it on first use"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=10,
+                follow_redirects=True,
+                # HTTP/2 needs the optional h2 package
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(
+                    max_connections=CRAWL_MAX_CONNECTIONS,
+                    max_keepalive_connections=CRAWL_MAX_CONNECTIONS
+                )
+            )
+        return self._http
+    
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        """Per-host semaphore so one crawl cannot monopolize a single site"""
+        host = urlparse(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(CRAWL_MAX_CONNECTIONS_PER_HOST)
+        return self._host_slots[host]
+    
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
     
-    def crawl_website(self, base_url: str, max_inner_pages: int = 2) -> Optional[str]:
+    async def crawl_website(self, base_url: str, max_inner_pages: int = 2, refresh: bool = False) -> Optional[str]:
+        """Crawl website and return brand context string for LLM, or None if the crawl fails"""
+        crawled_context, _ = await self.crawl_with_time(base_url, max_inner_pages, refresh)
+        return crawled_context
+    
+    async def crawl_with_time(self, base_url: str, max_inner_pages: int = 2, refresh: bool = False) -> Tuple[Optional[str], Optional[datetime]]:
         """
-        Crawl website and return brand context string for LLM
+        Crawl website and return brand context string for LLM, with when it was crawled
         
         Args:
             base_url: The website homepage URL
             max_inner_pages: Number of inner pages to crawl
+            refresh: skip the fresh-cache shortcut; a cached entry is still
+                revalidated with a conditional request
         
         Returns:
-            String with brand context, or None if crawl fails
+            (brand context, crawled_at), or (None, None) if the crawl fails.
+            crawled_at is when the site was last fetched or revalidated,
+            which for a cache hit can be well before this call.
+            
+        The whole crawl shares one deadline. Inner pages are fetched
+        concurrently and whatever has finished when it expires is used.
+        Results are cached; a stale entry is revalidated with a conditional
+        request on the home page instead of a full re-crawl, and if the page
+        did change, that response is used as the home page fetch.
         """
         try:
+            cached = None
+            if self.cache:
+                cached = await self.cache.get(base_url, max_inner_pages)
+                if cached and not refresh and self.cache.is_fresh(cached):
+                    logger.info(f"Crawl cache hit: {base_url}")
+                    return cached["context"], cached["validated_at"]
+            
             pages_data = []
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.deadline_seconds
             
-            # Crawl home page
+            # Crawl home page, conditionally if a stale entry can be revalidated
             logger.info(f"Crawling: {base_url}")
-            home_data = self._fetch_page_data(base_url)
+            try:
+                home_data = await asyncio.wait_for(
+                    self._fetch_page_data(base_url, self._conditional_headers(cached) if cached else None),
+                    timeout=deadline - loop.time()
+                )
+            except asyncio.TimeoutError:
+                home_data = None
+            
+            if home_data is NOT_MODIFIED:
+                logger.info(f"Crawl cache revalidated: {base_url}")
+                await self.cache.mark_revalidated(cached)
+                return cached["context"], cached["validated_at"]
             
             if not home_data:
                 logger.warning("Failed to crawl home page")
-                return None
+                return None, None
             
             pages_data.append(home_data)
             
             # Extract and crawl inner pages
             try:
-                inner_links = self._extract_internal_links(base_url, home_data["html"])
-                
-                for link in inner_links[:max_inner_pages]:
-                    try:
-                        logger.info(f"Crawling inner page: {link}")
-                        page_data = self._fetch_page_data(link)
-                        if page_data:
-                            pages_data.append(page_data)
-                    except Exception as e:
-                        logger.warning(f"Failed to crawl {link}: {str(e)}")
-                        continue
+                inner_links = self._extract_internal_links(base_url, home_data["links"])
+                pages_data.extend(
+                    await self._fetch_inner_pages(inner_links[:max_inner_pages], deadline - loop.time())
+                )
             except Exception as e:
                 logger.warning(f"Failed to extract inner links: {str(e)}")
             
             # Build and return brand context
             brand_context = self._build_brand_context(pages_data)
             logger.info(f"✓ Crawled {len(pages_data)} pages successfully")
-            return brand_context
+            
+            crawled_at = datetime.utcnow()
+            if self.cache:
+                entry = await self.cache.set(
+                    base_url,
+                    max_inner_pages,
+                    brand_context,
+                    etag=home_data.get("etag"),
+                    last_modified=home_data.get("last_modified")
+                )
+                crawled_at = entry["validated_at"]
+            return brand_context, crawled_at
             
         except Exception as e:
             logger.error(f"Crawl failed: {str(e)}")
-            return None
+            return None, None
     
-    def _fetch_page_data(self, url: str) -> Optional[Dict]:
-        """Fetch and parse a single page"""
+    @staticmethod
+    def _conditional_headers(entry: Dict) -> Dict[str, str]:
+        """Validators to revalidate a cached home page with"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    async def _fetch_inner_pages(self, links: List[str], time_left: float) -> List[Dict]:
+        """Fetch inner pages concurrently, returning those done before the deadline"""
+        if not links or time_left <= 0:
+            return []
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def fetch(link: str) -> Optional[Dict]:
+            async with semaphore:
+                logger.info(f"Crawling inner page: {link}")
+                return await self._fetch_page_data(link)
+        
+        tasks = [asyncio.create_task(fetch(link)) for link in links]
+        done, pending = await asyncio.wait(tasks, timeout=time_left)
+        
+        if pending:
+            logger.warning(f"Crawl deadline reached, dropping {len(pending)} unfinished pages")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        # Keep link order so the context is stable across crawls
+        return [task.result() for task in tasks if task in done and task.result()]
+    
+    async def _fetch_page_data(self, url: str, headers: Optional[Dict[str, str]] = None):
+        """
+        Fetch a single page and parse it off the event loop
+        
+        With conditional headers, NOT_MODIFIED is returned on a 304.
+        """
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            page_data = {
-                "url": url,
-                "title": self._get_title(soup),
-                "meta_description": self._get_meta_description(soup),
-                "headings": self._get_headings(soup),
-                "text_content": self._get_clean_text(soup),
-                "html": str(soup)
-            }
+            async with self._host_slot(url):
+                async with self._get_client().stream("GET", url, headers=headers or None) as response:
+                    if response.status_code == 304 and headers:
+                        return NOT_MODIFIED
+                    response.raise_for_status()
+                    
+                    content_type = response.headers.get("content-type", "").lower()
+                    if content_type and not content_type.startswith(HTML_CONTENT_TYPES):
+                        logger.info(f"Skipping non-HTML page {url} ({content_type})")
+                        return None
+                    
+                    content = await self._read_capped(response, url)
             
+            # HTML parsing is CPU-bound, keep it off the event loop
+            page_data = await asyncio.to_thread(self._parse_page, url, content)
+            page_data["etag"] = response.headers.get("etag")
+            page_data["last_modified"] = response.headers.get("last-modified")
             return page_data
             
         except Exception as e:
             logger.error(f"Error fetching {url}: {str(e)}")
             return None
     
+    async def _read_capped(self, response: httpx.Response, url: str) -> bytes:
+        """Read a streamed body, stopping once max_page_bytes is reached"""
+        body = bytearray()
+        
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) >= self.max_page_bytes:
+                # The head and early body hold most of what we extract
+                logger.warning(f"Truncating {url} at {self.max_page_bytes} bytes")
+                del body[self.max_page_bytes:]
+                break
+        
+        return bytes(body)
+    
+    def _parse_page(self, url: str, content: bytes) -> Dict:
+        """
+        Parse a fetched page into structured data in a single pass
+        
+        Links are collected before non-content elements are stripped, so
+        navigation links are kept. The raw HTML is not retained.
+        """
+        if self.parser == "selectolax":
+            return self._parse_with_selectolax(url, content)
+        
+        soup = BeautifulSoup(content, self.parser)
+        
+        page_data = {
+            "url": url,
+            "title": self._get_title(soup),
+            "meta_description": self._get_meta_description(soup),
+            "headings": self._get_headings(soup),
+            "links": [a_tag['href'] for a_tag in soup.find_all('a', href=True)],
+            "text_content": self._get_clean_text(soup)
+        }
+        
+        return page_data
+    
+    def _parse_with_selectolax(self, url: str, content: bytes) -> Dict:
+        """Same extraction as _parse_page using the selectolax backend"""
+        from selectolax.lexbor import LexborHTMLParser
+        
+        tree = LexborHTMLParser(content)
+        
+        title_node = tree.css_first('title')
+        
+        meta_description = ""
+        for selector in ('meta[name="description"]', 'meta[property="og:description"]'):
+            node = tree.css_first(selector)
+            if node and node.attributes.get('content'):
+                meta_description = node.attributes['content'].strip()
+                break
+        
+        headings = {}
+        for level in ["h1", "h2", "h3"]:
+            texts = (node.text(strip=True) for node in tree.css(level))
+            headings[level] = [text for text in texts if text]
+        
+        links = [node.attributes.get('href') for node in tree.css('a[href]')]
+        
+        tree.strip_tags(NON_CONTENT_TAGS)
+        text = tree.root.text(separator=' ', strip=True) if tree.root else ""
+        
+        return {
+            "url": url,
+            "title": title_node.text(strip=True) if title_node else "",
+            "meta_description": meta_description,
+            "headings": headings,
+            "links": [href for href in links if href],
+            "text_content": self._normalize_text(text)
+        }
+    
     def _get_title(self, soup: BeautifulSoup) -> str:
         """Extract page title"""
         title_tag = soup.find('title')
@@ -183,30 +354,32 @@ class WebCrawler:
     
     def _get_clean_text(self, soup: BeautifulSoup) -> str:
         """Extract clean text content"""
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript']):
+        for element in soup(NON_CONTENT_TAGS):
             element.decompose()
         
-        text = soup.get_text(separator=' ', strip=True)
-        
+        return self._normalize_text(soup.get_text(separator=' ', strip=True))
+    
+    def _normalize_text(self, text: str) -> str:
+        """Collapse whitespace and cap text length"""
         lines = (line.strip() for line in text.splitlines())
         chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
         text = ' '.join(chunk for chunk in chunks if chunk)
         
         return text[:3000]
     
-    def _extract_internal_links(self, base_url: str, html: str) -> List[str]:
-        """Extract internal links from HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
+    def _extract_internal_links(self, base_url: str, hrefs: List[str]) -> List[str]:
+        """Filter a page's hrefs down to internal links, in document order"""
         base_domain = urlparse(base_url).netloc
         
-        links = set()
+        links = {}
         
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            
+        for href in hrefs:
             if href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
                 continue
             
+            if urlparse(href).path.lower().endswith(NON_HTML_EXTENSIONS):
+                continue
+            
             full_url = urljoin(base_url, href)
             parsed = urlparse(full_url)
             
@@ -214,29 +387,10 @@ class WebCrawler:
                 clean_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
                 
                 if clean_url.rstrip('/') != base_url.rstrip('/'):
-                    links.add(clean_url)
+                    links[clean_url] = None
         
         return list(links)[:5]  # Limit to 5 links
     
     def _build_brand_context(self, pages: List[Dict]) -> str:
-        """Build brand context string from crawled pages"""
-        context_parts = []
-        
-        for i, page in enumerate(pages):
-            if i == 0:
-                context_parts.append(f"=== HOME PAGE ===\nURL: {page['url']}")
-            else:
-                context_parts.append(f"\n=== PAGE {i} ===\nURL: {page['url']}")
-            
-            if page['title']:
-                context_parts.append(f"Title: {page['title']}")
-            
-            if page['meta_description']:
-                context_parts.append(f"Description: {page['meta_description']}")
-            
-            if page['headings']['h1']:
-                context_parts.append(f"Main Headings: {', '.join(page['headings']['h1'][:3])}")
-            
-            context_parts.append(f"Content Preview:\n{page['text_content'][:800]}")
-        
-        return '\n'.join(context_parts)
\ No newline at end of file
+        """Build the token-budgeted brand context string from crawled pages"""
+        return build_brand_context(pages, self.context_token_budget)
\ No newline at end of file
@@ -1,42 +1,140 @@
 # db.py
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, UpdateOne
 from pymongo.errors import ServerSelectionTimeoutError
 import os
-from datetime import datetime
+import json
+import base64
+import hashlib
+import logging
+from datetime import datetime, timedelta
 from bson.objectid import ObjectId
+from app.cache import TTLCache
+from app.page_cache import invalidate_page
+from app.history import history_heads, build_version_document, rebuild_sections, next_head, edited_sections
 
 import dns.resolver
 _res = dns.resolver.Resolver(configure=True)
 _res.nameservers = ['1.1.1.1', '8.8.8.8']  # Cloudflare + Google
 dns.resolver.default_resolver = _res
 
+logger = logging.getLogger(__name__)
+
 MONGO_URI = os.getenv("MONGO_URI")
 if not MONGO_URI:
     raise ValueError("MONGO_URI not found in environment variables")
 
-client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, tls=True,)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+
+# Async client so route handlers never block the event loop on a round trip
+client = AsyncMongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, tls=True, maxPoolSize=MONGO_MAX_POOL_SIZE)
 db = client["landing_page_builder"]
 pages_collection = db["pages"]
+crawl_cache_collection = db["crawl_cache"]
+# Immutable published versions, read by public traffic instead of the pages collection
+published_collection = db["published_pages"]
+jobs_collection = db["jobs"]
+# Crawled brand context, stored once per distinct text and referenced by pages
+brand_contexts_collection = db["brand_contexts"]
+# Per-version section history: periodic full snapshots and deltas against them
+page_versions_collection = db["page_versions"]
+
+# Stale crawl entries are kept this long so they can still be revalidated
+CRAWL_CACHE_RETENTION_SECONDS = int(os.getenv("CRAWL_CACHE_RETENTION_SECONDS", str(30 * 86400)))
+# Finished background jobs are kept this long for status polling
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+BRAND_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("BRAND_CONTEXT_CACHE_MAX_ENTRIES", "512"))
+
+# Contexts are content-addressed and never change, so they only leave by LRU
+brand_context_cache = TTLCache(max_size=BRAND_CONTEXT_CACHE_MAX_ENTRIES, ttl_seconds=None)
 
-def init_db():
+class VersionConflictError(Exception):
+    """Raised when a conditional write finds the page at a different version"""
+    
+    def __init__(self, page_id: str, expected_version: int, current_version: int):
+        self.page_id = page_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+        super().__init__(
+            f"Page {page_id} is at version {current_version}, expected {expected_version}"
+        )
+
+async def init_db():
     """Initialize database indices"""
     try:
         # Test connection
-        client.admin.command('ping')
+        await client.admin.command('ping')
         print("✓ MongoDB connected")
         
         # Create indices
-        pages_collection.create_index("page_id", unique=True)
-        pages_collection.create_index("created_at")
-        pages_collection.create_index("user_id")
+        await pages_collection.create_index("page_id", unique=True)
+        await pages_collection.create_index("created_at")
+        await pages_collection.create_index("user_id")
+        # Keyset pagination for listings, newest first, with and without a user filter
+        await pages_collection.create_index([("user_id", 1), ("updated_at", -1), ("_id", -1)])
+        await pages_collection.create_index([("updated_at", -1), ("_id", -1)])
+        await published_collection.create_index([("page_id", 1), ("version", -1)], unique=True)
+        await page_versions_collection.create_index([("page_id", 1), ("version", -1)], unique=True)
+        await page_versions_collection.create_index([("page_id", 1), ("kind", 1), ("version", -1)])
+        await jobs_collection.create_index("job_id", unique=True)
+        await jobs_collection.create_index("status")
+        await jobs_collection.create_index([("status", 1), ("lease_until", 1)])
+        await jobs_collection.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+        await crawl_cache_collection.create_index("validated_at", expireAfterSeconds=CRAWL_CACHE_RETENTION_SECONDS)
         print("✓ Database indices created")
     except ServerSelectionTimeoutError:
         print("✗ Failed to connect to MongoDB")
         raise
 
-def save_page(page_spec: dict, user_context: dict = None, crawled_context: str = None, user_id: str = None) -> dict:
-    """Save page spec to MongoDB"""
-    document = {
+def brand_context_ref(crawled_context: str) -> str:
+    """Content address of a crawled brand context"""
+    return hashlib.sha256(crawled_context.encode("utf-8")).hexdigest()
+
+async def save_brand_context(crawled_context: str = None, website_url: str = None, crawled_at: datetime = None) -> str:
+    """
+    Store a brand context once and return its reference, or None if there is none
+    
+    crawled_at is when the site was fetched or revalidated, which for a
+    crawl cache hit is earlier than now. The stored time only ever moves
+    forward to it; saving without one never refreshes it.
+    """
+    if not crawled_context:
+        return None
+    
+    ref = brand_context_ref(crawled_context)
+    now = datetime.utcnow()
+    update = {
+        "$setOnInsert": {"context": crawled_context, "created_at": now},
+        "$set": {"url": website_url}
+    }
+    if crawled_at:
+        update["$max"] = {"crawled_at": crawled_at}
+    else:
+        update["$setOnInsert"]["crawled_at"] = now
+    
+    document = await brand_contexts_collection.find_one_and_update(
+        {"_id": ref},
+        update,
+        upsert=True,
+        return_document=True
+    )
+    brand_context_cache.set(ref, document)
+    return ref
+
+async def get_brand_context(ref: str) -> dict:
+    """Retrieve a brand context document (context, url, crawled_at) by reference"""
+    if not ref:
+        return None
+    
+    document = brand_context_cache.get(ref)
+    if document is None:
+        document = await brand_contexts_collection.find_one({"_id": ref})
+        if document:
+            brand_context_cache.set(ref, document)
+    return document
+
+def _page_document(page_spec: dict, user_context: dict = None, context_ref: str = None, user_id: str = None) -> dict:
+    """New page document for a generated page spec"""
+    return {
         "page_id": page_spec.get("pageId"),
         "version": page_spec.get("version", 1),
         "sections": page_spec.get("sections", []),
@@ -45,27 +143,241 @@ def save_page(page_spec: dict, user_context: dict = None, crawled_context: str =
         "user_id": user_id,
         "published": False,
         "user_context": user_context or {},
-        "crawled_context": crawled_context
+        "context_ref": context_ref
+    }
+
+async def _load_history_heads(page_ids: set) -> dict:
+    """
+    Latest history record and latest snapshot per page, from the cache or
+    with two aggregations for all pages missing from it
+    """
+    states = {}
+    missing = []
+    for page_id in page_ids:
+        state = history_heads.get(page_id)
+        if state is None:
+            missing.append(page_id)
+        else:
+            states[page_id] = state
+    if not missing:
+        return states
+    
+    def latest(match: dict) -> list:
+        return [
+            {"$match": match},
+            {"$sort": {"page_id": 1, "version": -1}},
+            {"$group": {"_id": "$page_id", "record": {"$first": "$$ROOT"}}}
+        ]
+    
+    heads = {
+        row["_id"]: row["record"]
+        async for row in await page_versions_collection.aggregate(latest({"page_id": {"$in": missing}}))
+    }
+    bases = {
+        row["_id"]: row["record"]
+        async for row in await page_versions_collection.aggregate(latest({"page_id": {"$in": missing}, "kind": "snapshot"}))
     }
     
-    result = pages_collection.insert_one(document)
+    for page_id, head in heads.items():
+        base = bases.get(page_id)
+        if base is None:
+            continue
+        if head["kind"] == "delta" and head["base_version"] != base["version"]:
+            # The head cannot be rebuilt from this base, which is still fine for new deltas
+            head = base
+        states[page_id] = {"head": head, "base": base}
+        history_heads.set(page_id, states[page_id])
+    return states
+
+async def _record_versions(entries: list, new_pages: bool = False) -> None:
+    """
+    Add page versions to their history with one bulk write
+    
+    Args:
+        entries: (page_id, version, sections) tuples, oldest first per page
+        new_pages: the pages were just created, so there is no history to load
+    
+    A version already in the history is never rewritten. A failure is
+    logged rather than raised: the page writes it follows have already
+    been applied, and history is secondary to them.
+    """
+    if not entries:
+        return
+    try:
+        states = {} if new_pages else await _load_history_heads({page_id for page_id, _, _ in entries})
+    
+        requests = []
+        for page_id, version, sections in entries:
+            state = states.get(page_id)
+            if state and state["head"]["version"] == version:
+                continue
+    
+            document = build_version_document(page_id, version, sections, state["base"] if state else None)
+            requests.append(UpdateOne(
+                {"page_id": page_id, "version": version},
+                {"$setOnInsert": document},
+                upsert=True
+            ))
+            if not state or version > state["head"]["version"]:
+                states[page_id] = next_head(state, document)
+    
+        if requests:
+            await page_versions_collection.bulk_write(requests, ordered=False)
+        for page_id, state in states.items():
+            history_heads.set(page_id, state)
+    except Exception as e:
+        # The cached heads may no longer match what was written
+        for page_id, _, _ in entries:
+            history_heads.pop(page_id)
+        logger.error(f"Failed to record {len(entries)} page versions: {e}")
+
+async def _record_section_edit(page_id: str, version: int, section_data: dict) -> None:
+    """
+    Add a version that only replaced some sections' data to the history
+    
+    The version is built in memory from the cached previous version; the
+    page's sections are only read back when that is not cached.
+    """
+    sections = edited_sections(history_heads.get(page_id), version, section_data)
+    if sections is None:
+        try:
+            page = await pages_collection.find_one(
+                {"page_id": page_id, "version": version},
+                projection={"_id": 0, "sections": 1}
+            )
+        except Exception as e:
+            logger.error(f"Failed to read version {version} of page {page_id} for its history: {e}")
+            return
+        if not page:
+            logger.warning(f"Page {page_id} moved past version {version} before it was recorded")
+            return
+        sections = page["sections"]
+    
+    await _record_versions([(page_id, version, sections)])
+
+async def save_page(page_spec: dict, user_context: dict = None, crawled_context: str = None, user_id: str = None, website_url: str = None, crawled_at: datetime = None) -> dict:
+    """Save page spec to MongoDB, storing the crawled context by reference"""
+    context_ref = await save_brand_context(crawled_context, website_url, crawled_at)
+    document = _page_document(page_spec, user_context, context_ref, user_id)
+    
+    result = await pages_collection.insert_one(document)
     document["_id"] = str(result.inserted_id)
+    await _record_versions([(document["page_id"], document["version"], document["sections"])], new_pages=True)
     return document
 
-def get_page(page_id: str) -> dict:
-    """Retrieve page by ID"""
-    page = pages_collection.find_one({"page_id": page_id})
+async def save_pages(pages: list) -> int:
+    """
+    Save many generated pages with one insert_many
+    
+    Args:
+        pages: dicts with page_spec and optional user_context, crawled_context,
+            website_url, crawled_at and user_id, as for save_page
+    
+    Returns the number of pages inserted. Each distinct brand context is stored once.
+    """
+    context_refs = {}
+    documents = []
+    for page in pages:
+        crawled_context = page.get("crawled_context")
+        if crawled_context and crawled_context not in context_refs:
+            context_refs[crawled_context] = await save_brand_context(crawled_context, page.get("website_url"), page.get("crawled_at"))
+        documents.append(_page_document(
+            page["page_spec"],
+            page.get("user_context"),
+            context_refs.get(crawled_context),
+            page.get("user_id")
+        ))
+    
+    if not documents:
+        return 0
+    result = await pages_collection.insert_many(documents, ordered=False)
+    await _record_versions(
+        [(document["page_id"], document["version"], document["sections"]) for document in documents],
+        new_pages=True
+    )
+    return len(result.inserted_ids)
+
+async def get_page(page_id: str, include_context: bool = True) -> dict:
+    """
+    Retrieve page by ID
+    
+    With include_context, the referenced brand context is resolved into
+    crawled_context, crawled_url and crawled_at; otherwise it is not
+    fetched at all.
+    """
+    # Pages saved before contexts moved out may still carry the text inline
+    projection = None if include_context else {"crawled_context": 0}
+    page = await pages_collection.find_one({"page_id": page_id}, projection=projection)
     if page:
         page["_id"] = str(page["_id"])
+        if include_context and page.get("context_ref"):
+            brand_context = await get_brand_context(page["context_ref"])
+            if brand_context:
+                page["crawled_context"] = brand_context["context"]
+                page["crawled_url"] = brand_context.get("url")
+                page["crawled_at"] = brand_context.get("crawled_at")
     return page
 
-def get_all_pages(user_id: str = None, limit: int = 50) -> list:
-    """Retrieve all pages with optional user filtering"""
+async def page_exists(page_id: str) -> bool:
+    """Check whether a page exists without fetching the document"""
+    page = await pages_collection.find_one({"page_id": page_id}, projection={"_id": 1})
+    return page is not None
+
+def _encode_cursor(page: dict) -> str:
+    """Opaque cursor pointing just past a listed page"""
+    payload = json.dumps({"u": page["updated_at"].isoformat(), "i": str(page["_id"])})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Decode a listing cursor into (updated_at, _id), raising ValueError if invalid"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(payload["u"]), ObjectId(payload["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+async def get_all_pages(user_id: str = None, limit: int = 50, cursor: str = None) -> tuple:
+    """
+    Retrieve one page of summaries, newest first, with optional user filtering
+    
+    Uses keyset pagination on (updated_at, _id) and a server-side projection,
+    so sections and crawled context never leave the database.
+    
+    Returns:
+        (summaries, next_cursor) where next_cursor is None on the last page
+    """
     query = {}
     if user_id:
         query["user_id"] = user_id
     
-    pages = pages_collection.find(query).sort("updated_at", -1).limit(limit)
+    if cursor:
+        updated_at, last_id = _decode_cursor(cursor)
+        query["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": last_id}}
+        ]
+    
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"updated_at": -1, "_id": -1}},
+        # One extra row tells us whether there is a next page
+        {"$limit": limit + 1},
+        {"$project": {
+            "page_id": 1,
+            "version": 1,
+            "created_at": 1,
+            "updated_at": 1,
+            "published": 1,
+            "section_count": {"$size": {"$ifNull": ["$sections", []]}}
+        }}
+    ]
+    
+    pages = [page async for page in await pages_collection.aggregate(pipeline)]
+    
+    next_cursor = None
+    if len(pages) > limit:
+        pages = pages[:limit]
+        next_cursor = _encode_cursor(pages[-1])
     
     result = []
     for page in pages:
@@ -73,41 +385,142 @@ def get_all_pages(user_id: str = None, limit: int = 50) -> list:
             "_id": str(page["_id"]),
             "page_id": page["page_id"],
             "version": page.get("version", 1),
-            "section_count": len(page.get("sections", [])),
+            "section_count": page.get("section_count", 0),
             "created_at": page.get("created_at"),
             "updated_at": page.get("updated_at"),
             "published": page.get("published", False)
         })
     
-    return result
+    return result, next_cursor
 
-def update_page(page_id: str, sections: list) -> dict:
-    """Update page sections and increment version"""
-    page = get_page(page_id)
-    if not page:
-        return None
+async def _check_version(page_id: str, expected_version: int) -> None:
+    """After a conditional write missed, raise if the page moved to another version"""
+    page = await pages_collection.find_one({"page_id": page_id}, projection={"version": 1})
+    if page and page.get("version") != expected_version:
+        raise VersionConflictError(page_id, expected_version, page.get("version"))
+
+async def update_page(page_id: str, sections: list, expected_version: int = None) -> dict:
+    """
+    Update page sections and increment version atomically
     
-    new_version = page.get("version", 1) + 1
+    With expected_version, the write only applies if the page is still at
+    that version; otherwise VersionConflictError is raised.
+    """
+    query = {"page_id": page_id}
+    if expected_version is not None:
+        query["version"] = expected_version
     
-    result = pages_collection.find_one_and_update(
-        {"page_id": page_id},
+    result = await pages_collection.find_one_and_update(
+        query,
         {
             "$set": {
                 "sections": sections,
-                "version": new_version,
                 "updated_at": datetime.utcnow()
-            }
+            },
+            "$inc": {"version": 1}
         },
+        projection={"crawled_context": 0},
         return_document=True
     )
+    invalidate_page(page_id)
     
     if result:
         result["_id"] = str(result["_id"])
+        await _record_versions([(page_id, result["version"], result["sections"])])
+    elif expected_version is not None:
+        await _check_version(page_id, expected_version)
     return result
 
-def publish_page(page_id: str) -> dict:
+async def update_section(page_id: str, section_id: str, data: dict, expected_version: int = None, context_ref: str = None) -> int:
+    """
+    Replace one section's data and increment version in a single round trip
+    
+    With context_ref, the page is also pointed at a newly crawled brand context.
+    Returns the new version, or None if the page or section does not exist.
+    Raises VersionConflictError if expected_version no longer matches.
+    """
+    query = {"page_id": page_id, "sections.id": section_id}
+    if expected_version is not None:
+        query["version"] = expected_version
+    
+    fields = {
+        "sections.$[section].data": data,
+        "updated_at": datetime.utcnow()
+    }
+    if context_ref:
+        fields["context_ref"] = context_ref
+    
+    result = await pages_collection.find_one_and_update(
+        query,
+        {
+            "$set": fields,
+            "$inc": {"version": 1}
+        },
+        array_filters=[{"section.id": section_id}],
+        projection={"_id": 0, "version": 1},
+        return_document=True
+    )
+    invalidate_page(page_id)
+    
+    if result:
+        await _record_section_edit(page_id, result["version"], {section_id: data})
+    elif expected_version is not None:
+        await _check_version(page_id, expected_version)
+    return result["version"] if result else None
+
+async def update_sections(page_id: str, section_data: dict, expected_version: int = None, context_ref: str = None) -> tuple:
+    """
+    Replace several sections' data with a single write and version bump
+    
+    Args:
+        section_data: section ID -> new data
+    
+    Returns (new version, IDs of sections that were not written because the
+    page no longer has them), or (None, []) if the page does not exist.
+    Raises VersionConflictError if expected_version no longer matches.
+    """
+    query = {"page_id": page_id}
+    if expected_version is not None:
+        query["version"] = expected_version
+    
+    fields = {"updated_at": datetime.utcnow()}
+    array_filters = []
+    for i, (section_id, data) in enumerate(section_data.items()):
+        fields[f"sections.$[s{i}].data"] = data
+        array_filters.append({f"s{i}.id": section_id})
+    if context_ref:
+        fields["context_ref"] = context_ref
+    
+    result = await pages_collection.find_one_and_update(
+        query,
+        {
+            "$set": fields,
+            "$inc": {"version": 1}
+        },
+        array_filters=array_filters,
+        # The section IDs after the write show which filters matched nothing
+        projection={"_id": 0, "version": 1, "sections.id": 1},
+        return_document=True
+    )
+    invalidate_page(page_id)
+    
+    if not result:
+        if expected_version is not None:
+            await _check_version(page_id, expected_version)
+        return None, []
+    
+    present = {section.get("id") for section in result.get("sections", [])}
+    missing = [section_id for section_id in section_data if section_id not in present]
+    await _record_section_edit(
+        page_id,
+        result["version"],
+        {section_id: data for section_id, data in section_data.items() if section_id in present}
+    )
+    return result["version"], missing
+
+async def publish_page(page_id: str) -> dict:
     """Mark page as published"""
-    result = pages_collection.find_one_and_update(
+    result = await pages_collection.find_one_and_update(
         {"page_id": page_id},
         {
             "$set": {
@@ -115,14 +528,228 @@ def publish_page(page_id: str) -> dict:
                 "updated_at": datetime.utcnow()
             }
         },
+        projection={"crawled_context": 0},
         return_document=True
     )
+    invalidate_page(page_id)
     
     if result:
         result["_id"] = str(result["_id"])
     return result
 
-def delete_page(page_id: str) -> bool:
+async def delete_page(page_id: str) -> bool:
     """Delete a page"""
-    result = pages_collection.delete_one({"page_id": page_id})
-    return result.deleted_count > 0
\ No newline at end of file
+    result = await pages_collection.delete_one({"page_id": page_id})
+    await published_collection.delete_many({"page_id": page_id})
+    await page_versions_collection.delete_many({"page_id": page_id})
+    history_heads.pop(page_id)
+    invalidate_page(page_id)
+    return result.deleted_count > 0
+
+async def iter_pages(user_id: str = None, batch_size: int = 500):
+    """Yield every page document (without _id) in insertion order, fetched batch_size at a time"""
+    query = {"user_id": user_id} if user_id else {}
+    cursor = pages_collection.find(query, projection={"_id": 0}).sort("_id", 1).batch_size(batch_size)
+    async for page in cursor:
+        yield page
+
+async def upsert_brand_contexts(documents: list) -> int:
+    """Store brand context documents that do not exist yet, returning how many were new"""
+    if not documents:
+        return 0
+    result = await brand_contexts_collection.bulk_write(
+        [
+            UpdateOne(
+                {"_id": document["_id"]},
+                {"$setOnInsert": {key: value for key, value in document.items() if key != "_id"}},
+                upsert=True
+            )
+            for document in documents
+        ],
+        ordered=False
+    )
+    return result.upserted_count
+
+def _import_update(document: dict) -> list:
+    """
+    Update pipeline that replaces a page with an imported document
+    
+    An existing page moves to max(current, imported) + 1, so a version
+    number (and its ETag) is never reused for different content. A new
+    page keeps the imported version.
+    """
+    imported_version = document["version"]
+    return [{"$replaceWith": {"$mergeObjects": [
+        {"_id": "$_id"},
+        # Literal so section text starting with "$" is not read as a field path
+        {"$literal": document},
+        {"version": {"$cond": [
+            {"$eq": [{"$type": "$version"}, "missing"]},
+            imported_version,
+            {"$add": [{"$max": ["$version", imported_version]}, 1]}
+        ]}}
+    ]}}]
+
+async def upsert_pages(documents: list) -> int:
+    """Insert or replace pages by page_id in one bulk write, returning how many were written"""
+    if not documents:
+        return 0
+    result = await pages_collection.bulk_write(
+        [UpdateOne({"page_id": document["page_id"]}, _import_update(document), upsert=True) for document in documents],
+        ordered=False
+    )
+    for document in documents:
+        invalidate_page(document["page_id"])
+    
+    # The written versions are decided server-side, so read them back for the history
+    cursor = pages_collection.find(
+        {"page_id": {"$in": [document["page_id"] for document in documents]}},
+        projection={"_id": 0, "page_id": 1, "version": 1, "sections": 1}
+    )
+    await _record_versions([(page["page_id"], page["version"], page["sections"]) async for page in cursor])
+    return result.upserted_count + result.matched_count
+
+async def list_page_versions(page_id: str, limit: int = 50, before: int = None) -> list:
+    """Summaries (version, kind, created_at) of a page's history, newest first"""
+    query = {"page_id": page_id}
+    if before is not None:
+        query["version"] = {"$lt": before}
+    cursor = page_versions_collection.find(
+        query,
+        projection={"_id": 0, "version": 1, "kind": 1, "created_at": 1}
+    ).sort("version", -1).limit(limit)
+    return [version async for version in cursor]
+
+async def get_page_version(page_id: str, version: int) -> dict:
+    """
+    Rebuild one version of a page from its history
+    
+    Takes at most two reads: the version's record and, for a delta, the
+    snapshot it was taken against.
+    
+    Returns page_id, version, created_at and sections, or None if that
+    version is not in the history.
+    """
+    document = await page_versions_collection.find_one({"page_id": page_id, "version": version})
+    if not document:
+        return None
+    
+    base = None
+    if document["kind"] == "delta":
+        base = await page_versions_collection.find_one(
+            {"page_id": page_id, "version": document["base_version"]}
+        )
+        if not base:
+            logger.error(f"Snapshot {document['base_version']} of page {page_id} is missing from its history")
+            return None
+    
+    return {
+        "page_id": page_id,
+        "version": version,
+        "created_at": document.get("created_at"),
+        "sections": rebuild_sections(document, base)
+    }
+
+async def get_crawl_cache_entry(key: str) -> dict:
+    """Retrieve a cached crawl result by cache key"""
+    return await crawl_cache_collection.find_one({"_id": key})
+
+async def save_crawl_cache_entry(entry: dict) -> None:
+    """Insert or replace a cached crawl result"""
+    await crawl_cache_collection.replace_one({"_id": entry["_id"]}, entry, upsert=True)
+
+async def save_published_snapshot(snapshot: dict) -> None:
+    """Store a published snapshot; an existing snapshot of that version is never overwritten"""
+    fields = {key: value for key, value in snapshot.items() if key != "_id"}
+    await published_collection.update_one(
+        {"_id": snapshot["_id"]},
+        {"$setOnInsert": fields},
+        upsert=True
+    )
+
+async def get_published_snapshot(page_id: str, version: int = None) -> dict:
+    """Retrieve a published snapshot, the latest one if no version is given"""
+    query = {"page_id": page_id}
+    if version is not None:
+        query["version"] = version
+    return await published_collection.find_one(query, sort=[("version", -1)])
+
+async def create_job(job: dict) -> dict:
+    """Save a new background job"""
+    await jobs_collection.insert_one(job)
+    job.pop("_id", None)
+    return job
+
+async def get_job(job_id: str) -> dict:
+    """Retrieve a background job by ID"""
+    return await jobs_collection.find_one({"job_id": job_id}, projection={"_id": 0})
+
+async def claim_job(job_id: str, lease_seconds: float) -> dict:
+    """
+    Atomically move a queued job to running, leased for lease_seconds
+    
+    Returns the job, or None if another worker already claimed it
+    """
+    now = datetime.utcnow()
+    return await jobs_collection.find_one_and_update(
+        {"job_id": job_id, "status": "queued"},
+        {
+            "$set": {
+                "status": "running",
+                "started_at": now,
+                "lease_until": now + timedelta(seconds=lease_seconds)
+            },
+            "$inc": {"attempts": 1}
+        },
+        projection={"_id": 0},
+        return_document=True
+    )
+
+async def renew_job_lease(job_id: str, lease_seconds: float) -> bool:
+    """Extend a running job's lease, returning False if the job is no longer running"""
+    result = await jobs_collection.update_one(
+        {"job_id": job_id, "status": "running"},
+        {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+    )
+    return result.matched_count > 0
+
+async def update_job(job_id: str, fields: dict) -> None:
+    """Update fields on a background job"""
+    await jobs_collection.update_one({"job_id": job_id}, {"$set": fields})
+
+async def release_job(job_id: str, fields: dict) -> None:
+    """Hand a running job back to the queue without counting the attempt against it"""
+    await jobs_collection.update_one(
+        {"job_id": job_id},
+        {
+            "$set": {**fields, "status": "queued", "lease_until": None},
+            "$inc": {"attempts": -1}
+        }
+    )
+
+async def requeue_expired_jobs(now: datetime) -> list:
+    """
+    Put running jobs whose lease ran out back in the queue
+    
+    A live worker keeps renewing its job's lease, so an expired lease means
+    the worker died. Jobs without a lease predate leases and are reclaimed too.
+    
+    Returns the IDs of the jobs requeued
+    """
+    expired = {"status": "running", "lease_until": {"$not": {"$gte": now}}}
+    requeued = []
+    async for job in jobs_collection.find(expired, projection={"job_id": 1}):
+        # Conditional again, so a job renewed or reclaimed meanwhile is left alone
+        job = await jobs_collection.find_one_and_update(
+            {**expired, "job_id": job["job_id"]},
+            {"$set": {"status": "queued", "lease_until": None}},
+            projection={"job_id": 1}
+        )
+        if job:
+            requeued.append(job["job_id"])
+    return requeued
+
+async def queued_jobs() -> list:
+    """IDs of all queued jobs, oldest first"""
+    cursor = jobs_collection.find({"status": "queued"}, projection={"job_id": 1}).sort("created_at", 1)
+    return [job["job_id"] async for job in cursor]
\ No newline at end of file
@@ -0,0 +1,81 @@
+# history.py
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.cache import TTLCache
+
+# A full snapshot is stored at least this often, so deltas stay small
+PAGE_SNAPSHOT_INTERVAL = int(os.getenv("PAGE_SNAPSHOT_INTERVAL", "10"))
+HISTORY_HEAD_CACHE_MAX_ENTRIES = int(os.getenv("HISTORY_HEAD_CACHE_MAX_ENTRIES", "1024"))
+
+# Per page, the latest history record ("head") and the snapshot it is
+# rebuilt from ("base"). Versions come from an atomic $inc, so a cached
+# head at version n - 1 is always the real predecessor of version n.
+history_heads = TTLCache(max_size=HISTORY_HEAD_CACHE_MAX_ENTRIES, ttl_seconds=None)
+
+
+def build_version_document(page_id: str, version: int, sections: List[dict], base: Optional[dict]) -> dict:
+    """
+    History record for one page version
+
+    A delta is taken against a snapshot rather than the previous version,
+    so any version can be rebuilt from at most two records. It lists the
+    sections that differ from the snapshot, the ids removed since, and the
+    current section order. A full snapshot is stored instead for the first
+    version, every PAGE_SNAPSHOT_INTERVAL versions, or when every section
+    changed anyway.
+    """
+    document = {"page_id": page_id, "version": version, "created_at": datetime.utcnow()}
+
+    if base is not None and 0 < version - base["version"] < PAGE_SNAPSHOT_INTERVAL:
+        base_sections = {section["id"]: section for section in base["sections"]}
+        changed = [section for section in sections if base_sections.get(section["id"]) != section]
+
+        if len(changed) < len(sections):
+            current_ids = {section["id"] for section in sections}
+            document.update({
+                "kind": "delta",
+                "base_version": base["version"],
+                "changed": changed,
+                "removed": [section_id for section_id in base_sections if section_id not in current_ids],
+                "order": [section["id"] for section in sections]
+            })
+            return document
+
+    document.update({"kind": "snapshot", "sections": sections})
+    return document
+
+
+def rebuild_sections(document: dict, base: Optional[dict] = None) -> List[dict]:
+    """Sections of a version from its history record and, for a delta, its base snapshot"""
+    if document["kind"] == "snapshot":
+        return document["sections"]
+
+    by_id = {section["id"]: section for section in base["sections"]}
+    for section_id in document["removed"]:
+        by_id.pop(section_id, None)
+    for section in document["changed"]:
+        by_id[section["id"]] = section
+    return [by_id[section_id] for section_id in document["order"] if section_id in by_id]
+
+
+def next_head(state: Optional[dict], document: dict) -> dict:
+    """History cache entry after recording document"""
+    base = document if document["kind"] == "snapshot" else state["base"]
+    return {"head": document, "base": base}
+
+
+def edited_sections(state: Optional[dict], version: int, section_data: Dict[str, dict]) -> Optional[List[dict]]:
+    """
+    Sections of a version that only replaced some sections' data, built
+    from the cached predecessor; None if version - 1 is not the cached head
+    """
+    if state is None or state["head"]["version"] != version - 1:
+        return None
+
+    sections = rebuild_sections(state["head"], state["base"])
+    return [
+        {**section, "data": section_data[section["id"]]} if section["id"] in section_data else section
+        for section in sections
+    ]
@@ -0,0 +1,200 @@
+# jobs.py
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.models import GeneratePageRequest
+from app.pipeline import generate_and_save_page
+from app.llm.limiter import LLMOverloadedError
+from app.db import (
+    create_job,
+    claim_job,
+    renew_job_lease,
+    update_job,
+    release_job,
+    requeue_expired_jobs,
+    queued_jobs
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job is leased for this long and the lease is renewed while it runs;
+# once it lapses the worker is assumed dead and the job is requeued
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+JobRunner = Callable[[dict, Dict[str, int]], Awaitable[dict]]
+
+
+async def run_generation_job(payload: dict, timings: Dict[str, int]) -> dict:
+    """Default job runner: crawl, generate and save one page"""
+    request = GeneratePageRequest(**payload)
+    page_spec = await generate_and_save_page(request, timings)
+    return {"pageId": page_spec["pageId"], "version": page_spec["version"]}
+
+
+class JobQueue:
+    """
+    Bounded pool of asyncio workers running jobs persisted in Mongo.
+
+    Jobs are written to the store before they are queued, and claimed
+    atomically before they run, so queued jobs are picked up again on the
+    next start. A running job holds a lease its worker keeps renewing; a
+    sweep requeues jobs whose lease lapsed because their worker died. The
+    runner is injectable so tests can swap in a fake LLM pipeline.
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner = run_generation_job,
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ):
+        self.runner = runner
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._deferred: Set[asyncio.TimerHandle] = set()
+
+    async def start(self) -> None:
+        """Start the workers and the lease sweep, and queue any jobs left waiting"""
+        self._queue = asyncio.Queue()
+
+        await requeue_expired_jobs(datetime.utcnow())
+        pending = await queued_jobs()
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        if pending:
+            logger.info(f"Queued {len(pending)} unfinished jobs")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running go back to queued"""
+        # Deferred jobs are already queued in the store for the next start
+        for handle in self._deferred:
+            handle.cancel()
+        self._deferred.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: dict) -> dict:
+        """Persist a new job and queue it, returning the job document"""
+        job = await create_job({
+            "job_id": f"job-{uuid.uuid4().hex[:12]}",
+            "status": "queued",
+            "payload": payload,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+            "attempts": 0,
+            "timings": {},
+            "result": None,
+            "error": None
+        })
+        self._queue.put_nowait(job["job_id"])
+        return job
+
+    async def _sweep(self) -> None:
+        """Requeue jobs whose worker stopped renewing their lease"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 2)
+            try:
+                requeued = await requeue_expired_jobs(datetime.utcnow())
+            except Exception as e:
+                logger.error(f"Job lease sweep failed: {str(e)}")
+                continue
+            for job_id in requeued:
+                self._queue.put_nowait(job_id)
+            if requeued:
+                logger.warning(f"Requeued {len(requeued)} jobs with expired leases")
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renew a running job's lease until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await renew_job_lease(job_id, self.lease_seconds):
+                    logger.warning(f"Job {job_id} is no longer running; stopped renewing its lease")
+                    return
+            except Exception as e:
+                logger.error(f"Failed to renew lease of job {job_id}: {str(e)}")
+
+    def _defer(self, job_id: str, delay: float) -> None:
+        """Put a job back on the local queue after delay seconds"""
+        def requeue() -> None:
+            self._deferred.discard(handle)
+            self._queue.put_nowait(job_id)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._deferred.add(handle)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job {job_id} could not be processed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await claim_job(job_id, self.lease_seconds)
+        if not job:
+            # Already claimed by another worker or process
+            return
+
+        if job["attempts"] > self.max_attempts:
+            await update_job(job_id, {
+                "status": "failed",
+                "error": f"Gave up after {self.max_attempts} attempts",
+                "finished_at": datetime.utcnow()
+            })
+            return
+
+        timings = {"queued_ms": int((job["started_at"] - job["created_at"]).total_seconds() * 1000)}
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        try:
+            result = await self.runner(job["payload"], timings)
+            await update_job(job_id, {
+                "status": "succeeded",
+                "result": result,
+                "error": None,
+                "timings": timings,
+                "finished_at": datetime.utcnow()
+            })
+        except asyncio.CancelledError:
+            # Shutting down mid-job: hand it back for the next start
+            await release_job(job_id, {})
+            raise
+        except LLMOverloadedError as e:
+            # Out of model capacity is not the job's fault: requeue it later
+            # without counting the attempt, and free this worker meanwhile
+            logger.warning(f"Job {job_id} deferred {e.retry_after:.0f}s: {str(e)}")
+            await release_job(job_id, {"timings": timings})
+            self._defer(job_id, e.retry_after)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            await update_job(job_id, {
+                "status": "failed",
+                "error": str(e),
+                "timings": timings,
+                "finished_at": datetime.utcnow()
+            })
+        finally:
+            heartbeat.cancel()
+
+
+job_queue = JobQueue()
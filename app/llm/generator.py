@@ -1,9 +1,38 @@
 # generator.py
 import os
 import json
-from openai import AzureOpenAI
-from .prompts import build_landing_page_prompt, build_section_regenerate_prompt
+import copy
+import uuid
+import asyncio
+import hashlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from openai import AsyncAzureOpenAI
+from .prompts import (
+    SECTION_ORDER,
+    LANDING_PAGE_PREFIX,
+    SECTION_REGENERATE_PREFIX,
+    PAGE_BRIEF_PREFIX,
+    SECTION_GENERATE_PREFIX,
+    build_landing_page_prompt,
+    build_page_brief_prompt,
+    build_section_generate_prompt,
+    build_section_regenerate_prompt
+)
+from .streaming import SectionStreamParser
+from .limiter import LLMOverloadedError, estimate_tokens, llm_limiter
+from .retry import open_hedged, with_retries
+from .repair import repair_json
+from .usage import llm_usage
+from .schema import (
+    PAGE_SPEC_RESPONSE_FORMAT,
+    JSON_OBJECT_RESPONSE_FORMAT,
+    section_error,
+    section_response_format
+)
+from app.cache import TTLCache
 from app.crawler import WebCrawler
+from app.crawl_cache import CrawlCache
+from app.db import get_crawl_cache_entry, save_crawl_cache_entry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,20 +44,245 @@ AZURE_API_KEY = os.getenv("AZURE_API_KEY")
 if not AZURE_ENDPOINT or not AZURE_API_KEY:
     raise ValueError("AZURE_ENDPOINT or AZURE_API_KEY not found in environment variables")
 
-client = AzureOpenAI(
+client = AsyncAzureOpenAI(
     api_key=AZURE_API_KEY,
     api_version="2024-10-21",
-    azure_endpoint=AZURE_ENDPOINT
+    azure_endpoint=AZURE_ENDPOINT,
+    # Retries are handled in app.llm.retry, with backoff that honors Retry-After
+    max_retries=0
 )
 
-crawler = WebCrawler()
+# Shared by the routes so every crawl goes through the same cache
+crawler = WebCrawler(cache=CrawlCache(load=get_crawl_cache_entry, save=save_crawl_cache_entry))
+
+# Cache of parsed page specs keyed on the normalized generation inputs
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+page_spec_cache = TTLCache(max_size=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+
+# Identical generations currently waiting on the model, shared by all callers
+_inflight_page_specs: Dict[str, asyncio.Future] = {}
+
+USER_CONTEXT_FIELDS = ("industry", "offer", "target_audience", "brand_tone")
+
+# Labels for the usage metrics, one per static prompt prefix
+PROMPT_NAMES = {
+    LANDING_PAGE_PREFIX: "landing_page",
+    SECTION_REGENERATE_PREFIX: "section_regenerate",
+    PAGE_BRIEF_PREFIX: "page_brief",
+    SECTION_GENERATE_PREFIX: "section_generate"
+}
+
+
+def _open_completion_stream(prefix: str, prompt: str, max_tokens: int, response_format: Optional[dict] = None, admitted: Optional[asyncio.Future] = None) -> AsyncIterator[str]:
+    """
+    One streamed chat completion attempt, yielding text deltas as they arrive
+    
+    The static prefix goes first as the system message so consecutive calls
+    share it and Azure can serve it from its prompt cache. admitted, if
+    given, is resolved with the time the limiter let the call through.
+    """
+    options = {"response_format": response_format} if response_format else {}
+
+    async def deltas():
+        # The slot is held until the stream ends, since the call is in flight until then
+        async with llm_limiter.slot(estimate_tokens(prefix + prompt, max_tokens)) as timer:
+            if admitted is not None and not admitted.done():
+                admitted.set_result(timer.started)
+            stream = await client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": prefix},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True},
+                **options
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    llm_usage.record(PROMPT_NAMES.get(prefix, "other"), chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    timer.first_token()
+                    yield chunk.choices[0].delta.content
+    return deltas()
+
+
+async def _chat_completion(prefix: str, prompt: str, max_tokens: int, response_format: Optional[dict] = None) -> str:
+    """Send a chat completion request and return the response text"""
+    async def attempt() -> str:
+        # Streamed internally so a stuck call can be hedged on its first token
+        first, stream = await open_hedged(lambda admitted: _open_completion_stream(prefix, prompt, max_tokens, response_format, admitted))
+        parts = [first] if first else []
+        async for delta in stream:
+            parts.append(delta)
+        return "".join(parts)
+
+    return await with_retries(attempt)
+
+
+async def _chat_completion_stream(prefix: str, prompt: str, max_tokens: int, response_format: Optional[dict] = None) -> AsyncIterator[str]:
+    """Stream a chat completion, yielding text deltas as they arrive"""
+    # Retries and hedging only cover the wait for the first token; once
+    # deltas have been handed out a failure cannot be replayed
+    first, stream = await with_retries(
+        lambda: open_hedged(lambda admitted: _open_completion_stream(prefix, prompt, max_tokens, response_format, admitted))
+    )
+    try:
+        if first:
+            yield first
+        async for delta in stream:
+            yield delta
+    finally:
+        await stream.aclose()
+
+
+def _page_spec_key(user_input: dict, crawled_context: str = None, mode: str = "single") -> str:
+    """Hash the inputs that determine the generation prompt"""
+    fields = {field: " ".join(str(user_input.get(field, "")).split()) for field in USER_CONTEXT_FIELDS}
+    payload = json.dumps({"input": fields, "context": crawled_context or "", "mode": mode}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _with_new_page_id(page_spec: dict) -> dict:
+    """Copy a shared spec so each caller saves its own page"""
+    page_spec = copy.deepcopy(page_spec)
+    page_spec["pageId"] = f"landing-{uuid.uuid4().hex[:8]}"
+    return page_spec
+
+
+async def _request_json(prefix: str, prompt: str, max_tokens: int, response_format: Optional[dict] = JSON_OBJECT_RESPONSE_FORMAT) -> dict:
+    """Call the model and parse its response as JSON, repairing it if needed"""
+    response_text = await _chat_completion(prefix, prompt, max_tokens=max_tokens, response_format=response_format)
+    
+    result = repair_json(response_text)
+    if not isinstance(result, dict):
+        raise ValueError("Failed to parse LLM response as JSON: expected an object")
+    return result
+
+
+async def _request_section(section_type: str, order: int, user_input: dict, brief: Optional[dict], crawled_context: str = None) -> dict:
+    """Generate one section of a new page against its section schema"""
+    prompt = build_section_generate_prompt(section_type, order, user_input, brief, crawled_context)
+    section = await _request_json(SECTION_GENERATE_PREFIX, prompt, max_tokens=800, response_format=section_response_format(section_type))
+    # The layout is fixed server-side, whatever the model echoed back
+    section.update({"id": f"{section_type}-1", "type": section_type, "order": order})
+    
+    error = section_error(section)
+    if error:
+        raise ValueError(f"Generated {section_type} section is invalid: {error}")
+    return section
+
+
+def _brief_from_sections(sections: List[dict]) -> Optional[dict]:
+    """Anchor re-requested sections to the hero the model already wrote"""
+    for section in sections:
+        if section.get("type") == "hero":
+            data = section["data"]
+            return {"headline": data.get("headline"), "subheadline": data.get("subheadline")}
+    return None
+
+
+async def _complete_sections(page_spec: dict, user_input: dict, crawled_context: str = None, brief: Optional[dict] = None) -> Tuple[dict, List[dict]]:
+    """
+    Validate each section and re-request only those that are invalid or missing
+    
+    Re-requested sections follow brief if given, else the generated hero.
+    
+    Returns:
+        tuple: the completed page spec and the sections that were re-requested
+    """
+    sections = page_spec.get("sections")
+    if not isinstance(sections, list):
+        sections = []
+    
+    valid = {}
+    extra = []
+    for section in sections:
+        error = section_error(section)
+        if error:
+            logger.warning(f"Dropping generated section {section.get('id') if isinstance(section, dict) else section!r}: {error}")
+        elif section["type"] in SECTION_ORDER and section["type"] not in valid:
+            valid[section["type"]] = section
+        else:
+            extra.append(section)
+    
+    failing = [(order, section_type) for order, section_type in enumerate(SECTION_ORDER) if section_type not in valid]
+    if len(failing) == len(SECTION_ORDER):
+        raise ValueError("Failed to parse LLM response: no usable sections")
+    
+    repaired = []
+    if failing:
+        logger.info(f"Re-requesting sections: {', '.join(section_type for _, section_type in failing)}")
+        brief = brief or _brief_from_sections(list(valid.values()))
+        repaired = await asyncio.gather(*[
+            _request_section(section_type, order, user_input, brief, crawled_context)
+            for order, section_type in failing
+        ])
+        for section in repaired:
+            valid[section["type"]] = section
+    
+    page_spec["sections"] = sorted(list(valid.values()) + extra, key=lambda section: section["order"])
+    page_spec.setdefault("version", 1)
+    return page_spec, list(repaired)
+
 
-def generate_page_spec(user_input: dict, crawled_context: str = None) -> dict:
+async def _request_page_spec(user_input: dict, crawled_context: str = None) -> dict:
+    """Call the model for a full page spec in one completion"""
+    prompt = build_landing_page_prompt(user_input, crawled_context)
+    
+    # Log the actual prompt being sent
+    logger.debug(f"Full prompt length: {len(prompt)} characters")
+    logger.debug(f"Prompt contains 'BRAND CONTEXT': {'BRAND CONTEXT' in prompt}")
+    
+    page_spec = await _request_json(LANDING_PAGE_PREFIX, prompt, max_tokens=2500, response_format=PAGE_SPEC_RESPONSE_FORMAT)
+    page_spec, _ = await _complete_sections(page_spec, user_input, crawled_context)
+    return page_spec
+
+
+async def _request_page_spec_parallel(user_input: dict, crawled_context: str = None) -> dict:
+    """
+    Generate a page spec with one concurrent completion per section
+    
+    A short brief is generated first so the independently written sections
+    share a brand name, voice and palette. Wall-clock time is then roughly
+    the brief plus the slowest section instead of the sum of all sections.
+    A section that comes back invalid is re-requested on its own.
+    """
+    brief = await _request_json(PAGE_BRIEF_PREFIX, build_page_brief_prompt(user_input, crawled_context), max_tokens=400)
+    
+    results = await asyncio.gather(*[
+        _request_section(section_type, order, user_input, brief, crawled_context)
+        for order, section_type in enumerate(SECTION_ORDER)
+    ], return_exceptions=True)
+    
+    sections = []
+    for section_type, result in zip(SECTION_ORDER, results):
+        if isinstance(result, ValueError):
+            logger.warning(f"Parallel {section_type} section failed: {str(result)}")
+        elif isinstance(result, BaseException):
+            # Overload and transport errors are not the section's fault; fail as before
+            raise result
+        else:
+            sections.append(result)
+    
+    page_spec, _ = await _complete_sections({"version": 1, "sections": sections}, user_input, crawled_context, brief)
+    return page_spec
+
+async def generate_page_spec(user_input: dict, crawled_context: str = None, use_cache: bool = True, mode: str = "single") -> dict:
     """
     Generate a complete landing page spec using Azure OpenAI
     
+    Identical concurrent requests share one upstream call. With use_cache,
+    a recent result for the same inputs is returned without calling the model.
+    
     Args:
         user_input: dict with industry, offer, target_audience, brand_tone, and optional url
+        crawled_context: brand context from a website crawl
+        use_cache: whether to read and populate the response cache
+        mode: "single" for one completion, "parallel" for one completion per section
     
     Returns:
         dict: page specification JSON
@@ -36,16 +290,15 @@ def generate_page_spec(user_input: dict, crawled_context: str = None) -> dict:
     try:
         # Extract URL if provided
         website_url = user_input.get("url")
-        crawled_context = None
         
         print(f"\n[GENERATOR] user_input keys: {user_input.keys()}", flush=True)
         print(f"[GENERATOR] website_url: {website_url}", flush=True)
         
-        # Crawl website if URL provided
-        if website_url:
+        # Crawl website if URL provided and the caller has not crawled already
+        if website_url and not crawled_context:
             print(f"[GENERATOR] Starting crawl of: {website_url}", flush=True)
             logger.info(f"Crawling website: {website_url}")
-            crawled_context = crawler.crawl_website(website_url)
+            crawled_context = await crawler.crawl_website(website_url)
             print(f"[GENERATOR] Crawl result: {crawled_context is not None}", flush=True)
             if crawled_context:
                 print(f"[GENERATOR] Crawled context length: {len(crawled_context)}", flush=True)
@@ -53,7 +306,7 @@ def generate_page_spec(user_input: dict, crawled_context: str = None) -> dict:
             else:
                 print(f"[GENERATOR] Crawl returned None", flush=True)
                 logger.warning("Website crawl failed, proceeding without brand context")
-        else:
+        elif not website_url:
             print(f"[GENERATOR] No URL provided", flush=True)
             logger.info("No URL provided, generating without brand context")
         
@@ -63,99 +316,114 @@ def generate_page_spec(user_input: dict, crawled_context: str = None) -> dict:
             logger.info(f"Crawled context length: {len(crawled_context)} characters")
             logger.debug(f"First 500 chars of context: {crawled_context[:500]}")
         
-        prompt = build_landing_page_prompt(user_input, crawled_context)
+        key = _page_spec_key(user_input, crawled_context, mode)
         
-        # Log the actual prompt being sent
-        logger.debug(f"Full prompt length: {len(prompt)} characters")
-        logger.debug(f"Prompt contains 'BRAND CONTEXT': {'BRAND CONTEXT' in prompt}")
+        if use_cache:
+            cached = page_spec_cache.get(key)
+            if cached:
+                logger.info("Page spec cache hit")
+                return _with_new_page_id(cached)
         
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert landing page designer and conversion copywriter. "
-                        "You create compelling marketing copy that drives action, matches brand voice, "
-                        "and resonates with target audiences. You have deep knowledge of persuasive writing, "
-                        "user psychology, and marketing best practices. "
-                        "You always return your work as valid JSON with no markdown formatting."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=2500
-        )
+        # Join an identical generation that is already running, if any
+        task = _inflight_page_specs.get(key)
+        if task is None:
+            if mode == "parallel":
+                task = asyncio.ensure_future(_request_page_spec_parallel(user_input, crawled_context))
+            else:
+                task = asyncio.ensure_future(_request_page_spec(user_input, crawled_context))
+            _inflight_page_specs[key] = task
+            task.add_done_callback(lambda _: _inflight_page_specs.pop(key, None))
+        else:
+            logger.info("Joining in-flight page spec generation")
         
-        # Extract response text
-        response_text = response.choices[0].message.content
+        # Shield so one disconnecting caller does not cancel the others
+        page_spec = await asyncio.shield(task)
         
-        # Parse JSON
-        page_spec = json.loads(response_text)
-        return page_spec
+        if use_cache:
+            page_spec_cache.set(key, page_spec)
+        return _with_new_page_id(page_spec)
             
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse LLM response as JSON: {e}")
+    except (ValueError, LLMOverloadedError):
+        raise
     except Exception as e:
         raise Exception(f"Error generating page spec: {str(e)}")
 
 
-def regenerate_section(section: dict, prompt: str) -> dict:
+async def stream_page_spec(user_input: dict, crawled_context: str = None) -> AsyncIterator[dict]:
     """
-    Regenerate a single section with new prompt
+    Generate a page spec, yielding each section as soon as the model closes it
+    
+    Args:
+        user_input: dict with industry, offer, target_audience, brand_tone
+        crawled_context: brand context from a website crawl
+    
+    Yields:
+        dict: a "start" event with the pageId, one "section" event per
+        section (a section that failed validation is sent again once
+        re-requested), then a "page" event with the complete page spec
+    """
+    page_id = f"landing-{uuid.uuid4().hex[:8]}"
+    yield {"event": "start", "pageId": page_id}
+    
+    prompt = build_landing_page_prompt(user_input, crawled_context)
+    parser = SectionStreamParser()
+    
+    async for delta in _chat_completion_stream(LANDING_PAGE_PREFIX, prompt, max_tokens=2500, response_format=PAGE_SPEC_RESPONSE_FORMAT):
+        for section in parser.feed(delta):
+            yield {"event": "section", "section": section}
+    
+    try:
+        page_spec = repair_json(parser.buffer)
+        if not isinstance(page_spec, dict):
+            raise ValueError("Failed to parse LLM response as JSON: expected an object")
+    except ValueError:
+        # Keep whatever sections arrived intact
+        if not parser.sections:
+            raise
+        logger.warning(f"Streamed page spec was not valid JSON, keeping {len(parser.sections)} sections")
+        page_spec = {"version": 1, "sections": parser.sections}
+    
+    # Sections re-requested after failing validation replace any streamed copy
+    # with the same id; sections only recovered by repair are sent here too
+    streamed_ids = {section.get("id") for section in parser.sections}
+    page_spec, repaired = await _complete_sections(page_spec, user_input, crawled_context)
+    for section in page_spec["sections"]:
+        if section["id"] not in streamed_ids or any(section is r for r in repaired):
+            yield {"event": "section", "section": section}
+    
+    page_spec["pageId"] = page_id
+    page_spec.setdefault("version", 1)
+    yield {"event": "page", "page_spec": page_spec}
+
+
+async def regenerate_section(section: dict, user_context: dict, crawled_context: str = None) -> dict:
+    """
+    Regenerate a single section with one LLM call and no crawling
     
     Args:
         section: the section object to regenerate
-        prompt: the full prompt to send to LLM
+        user_context: industry, offer, target_audience and brand_tone
+        crawled_context: brand context, normally the one stored with the page
     
     Returns:
         dict: updated section
     """
     try:
-        # Extract and crawl URL if provided
-        website_url = prompt.get("url")
-        crawled_context = None
-        
-        if website_url:
-            logger.info(f"Crawling website for section regeneration: {website_url}")
-            crawled_context = crawler.crawl_website(website_url)
+        prompt = build_section_regenerate_prompt(section, user_context, crawled_context)
         
-        prompt = build_section_regenerate_prompt(section, prompt, crawled_context)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert landing page designer and conversion copywriter. "
-                        "You create compelling marketing copy that drives action, matches brand voice, "
-                        "and resonates with target audiences. You have deep knowledge of persuasive writing, "
-                        "user psychology, and marketing best practices. "
-                        "You always return your work as valid JSON with no markdown formatting."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=2000
+        updated_section = await _request_json(
+            SECTION_REGENERATE_PREFIX,
+            prompt,
+            max_tokens=2000,
+            response_format=section_response_format(section.get("type"))
         )
         
-        # Extract response text
-        response_text = response.choices[0].message.content
-        
-        # Parse JSON
-        updated_section = json.loads(response_text)
+        error = section_error(updated_section)
+        if error:
+            raise ValueError(f"Regenerated section is invalid: {error}")
         return updated_section
             
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse LLM response as JSON: {e}")
+    except (ValueError, LLMOverloadedError):
+        raise
     except Exception as e:
         raise Exception(f"Error regenerating section: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,240 @@
+# limiter.py
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from openai import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+# Deployment quota; keep a little below the Azure limits so bursts do not 429
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "80000"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "480"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# How long a caller may queue for a slot before giving up with a 503
+LLM_MAX_WAIT_SECONDS = float(os.getenv("LLM_MAX_WAIT_SECONDS", "20"))
+# A first token slower than this is treated as a sign of upstream saturation.
+# Time to first token does not grow with completion length, unlike total duration.
+LLM_FIRST_TOKEN_TARGET_SECONDS = float(os.getenv("LLM_FIRST_TOKEN_TARGET_SECONDS", "8"))
+
+
+class LLMOverloadedError(Exception):
+    """The model is over quota or the local queue is full; retry later"""
+
+    def __init__(self, message: str, retry_after: float, upstream: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        # True for a 429 from Azure, False when the local queue gave up
+        self.upstream = upstream
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus the completion budget"""
+    return len(prompt) // 4 + max_tokens
+
+
+def retry_after_seconds(error: Exception, default: float = 1.0) -> float:
+    """Read Retry-After (or Azure's retry-after-ms) from an API error response"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return default
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously, allowing bursts up to one minute's worth"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken, 0 if it is available now"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+    def drain(self) -> None:
+        """Empty the bucket after the server reported we are over quota"""
+        self._refill()
+        self.available = min(self.available, 0.0)
+
+
+class CallTimer:
+    """Timing of one admitted call, marked by the caller when its first token arrives"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def latency(self) -> float:
+        """Time to first token, or the whole call if no token was marked"""
+        return (self.first_token_at or time.monotonic()) - self.started
+
+
+class AdaptiveLimiter:
+    """
+    Shared gate in front of every Azure OpenAI call.
+
+    Calls wait for a request and a token budget (estimated from prompt length
+    and max_tokens) and for a concurrency slot. The concurrency limit follows
+    AIMD: it grows by roughly one per window of fast successes and halves on a
+    429 or a first token slower than the target. Only calls admitted after
+    the last decrease can trigger another one, so a burst of slow calls or
+    429s under the old limit halves it once rather than once per call.
+    Callers that cannot be admitted within max_wait_seconds get
+    LLMOverloadedError.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        min_concurrency: int = LLM_MIN_CONCURRENCY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_wait_seconds: float = LLM_MAX_WAIT_SECONDS,
+        first_token_target_seconds: float = LLM_FIRST_TOKEN_TARGET_SECONDS
+    ):
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.requests = TokenBucket(requests_per_minute)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_wait_seconds = max_wait_seconds
+        self.first_token_target_seconds = first_token_target_seconds
+        self.limit = float(max(min_concurrency, min(4, max_concurrency)))
+        self.active = 0
+        self.waiting = 0
+        self.throttled = 0
+        self.rejected = 0
+        self._decreased_at = float("-inf")
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _cond(self) -> asyncio.Condition:
+        # Created lazily so the limiter binds to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _increase(self) -> None:
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def _decrease(self, timer: CallTimer, reason: str) -> None:
+        if timer.started < self._decreased_at:
+            # Admitted under the limit already cut; its signal is not news
+            return
+        self._decreased_at = time.monotonic()
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        logger.warning(f"LLM concurrency limit reduced to {int(self.limit)} ({reason})")
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        cond = self._cond()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_seconds
+
+        async with cond:
+            self.waiting += 1
+            try:
+                while True:
+                    if self.active < int(self.limit):
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                        if wait == 0:
+                            self.requests.take(1)
+                            self.tokens.take(estimated_tokens)
+                            self.active += 1
+                            return
+                    else:
+                        wait = None
+
+                    remaining = deadline - loop.time()
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        self.rejected += 1
+                        raise LLMOverloadedError(
+                            "LLM capacity exhausted, try again shortly",
+                            retry_after=max(wait or 0.0, 1.0)
+                        )
+
+                    # Woken early when a slot frees up; otherwise re-check the budget
+                    try:
+                        await asyncio.wait_for(cond.wait(), timeout=min(wait or remaining, remaining))
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting -= 1
+
+    async def _release(self) -> None:
+        cond = self._cond()
+        async with cond:
+            self.active -= 1
+            cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int) -> AsyncIterator[CallTimer]:
+        """
+        Hold one admitted call for the duration of the block
+
+        The caller marks the first token on the yielded timer; that latency
+        drives the concurrency limit.
+        """
+        await self._acquire(estimated_tokens)
+        timer = CallTimer()
+        try:
+            yield timer
+        except RateLimitError as e:
+            self.throttled += 1
+            self.tokens.drain()
+            self._decrease(timer, "429 from Azure OpenAI")
+            raise LLMOverloadedError(
+                "Azure OpenAI rate limit reached, try again shortly",
+                retry_after=retry_after_seconds(e),
+                upstream=True
+            ) from e
+        else:
+            latency = timer.latency()
+            if latency > self.first_token_target_seconds:
+                self._decrease(timer, f"first token took {latency:.1f}s")
+            else:
+                self._increase()
+        finally:
+            await self._release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "active": self.active,
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "tokens_available": int(self.tokens.available),
+            "requests_available": int(self.requests.available)
+        }
+
+
+llm_limiter = AdaptiveLimiter()
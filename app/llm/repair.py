@@ -0,0 +1,110 @@
+# repair.py
+import re
+import json
+from typing import Any, List, Tuple
+
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?|\n?\s*```\s*$")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _strip_fences(text: str) -> str:
+    """Drop a markdown code fence and any prose around the outermost JSON value"""
+    text = _FENCE.sub("", text.strip())
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return text[min(starts):] if starts else text
+
+
+def _scan(text: str) -> Tuple[str, List[Tuple[int, List[str]]], List[str], bool]:
+    """
+    Walk the JSON text outside of strings once.
+
+    Returns the text with trailing commas removed, the positions where it
+    could be cut after a complete value (with the brackets still open
+    there), the brackets left open at the end, and whether it ends inside
+    a string.
+    """
+    out = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, List[str]]] = []
+    in_string = False
+    escaped = False
+
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            # A comma directly before a closer is a trailing comma
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(char)
+            cuts.append((len(out), list(stack)))
+            continue
+        elif char == ",":
+            # Everything before a comma is a complete member
+            cuts.append((len(out), list(stack)))
+
+        out.append(char)
+
+    return "".join(out), cuts, stack, in_string
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse a model response as JSON, fixing the usual ways it goes wrong.
+
+    Handles markdown code fences, surrounding prose, trailing commas and
+    output truncated by max_tokens (cut back to the last complete member and
+    closed). Raises ValueError if the text still cannot be parsed.
+    """
+    if text is None:
+        raise ValueError("Failed to parse LLM response as JSON: empty response")
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    candidate = _strip_fences(text)
+    cleaned, cuts, stack, in_string = _scan(candidate)
+
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        error = e
+
+    try:
+        # A complete value followed by stray text
+        return json.JSONDecoder().raw_decode(cleaned)[0]
+    except json.JSONDecodeError:
+        pass
+
+    if stack or in_string:
+        # Truncated: close the brackets still open at the last complete member
+        if not in_string:
+            cuts.append((len(cleaned), stack))
+        for position, open_brackets in reversed(cuts):
+            if not open_brackets and position < len(cleaned):
+                continue
+            closed = cleaned[:position] + "".join(_CLOSERS[b] for b in reversed(open_brackets))
+            try:
+                return json.loads(closed)
+            except json.JSONDecodeError:
+                continue
+
+    raise ValueError(f"Failed to parse LLM response as JSON: {error}")
@@ -0,0 +1,173 @@
+# retry.py
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple, TypeVar
+
+from openai import APIConnectionError, InternalServerError
+
+from .limiter import LLMOverloadedError, llm_limiter
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# A Retry-After longer than this is not worth holding the request open for
+LLM_MAX_RETRY_AFTER_SECONDS = float(os.getenv("LLM_MAX_RETRY_AFTER_SECONDS", "10"))
+# Upper bound on one attempt, first token to last
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "90"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+# Hedge delay until enough first-token latencies are recorded to estimate the p95
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "4"))
+LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1"))
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling window of time-to-first-token samples"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def hedge_after(self) -> float:
+        """Seconds to wait for a first token before firing a hedge request"""
+        p95 = self.percentile(0.95)
+        if p95 is None:
+            return LLM_HEDGE_AFTER_SECONDS
+        return max(p95, LLM_HEDGE_MIN_SECONDS)
+
+
+first_token_latency = LatencyTracker()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures: timeouts, dropped connections, 5xx and upstream 429s"""
+    if isinstance(error, LLMOverloadedError):
+        # A local queue timeout means we are already at capacity; retrying only adds load
+        return error.upstream
+    return isinstance(error, (asyncio.TimeoutError, APIConnectionError, InternalServerError))
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+async def with_retries(attempt: Callable[[], Awaitable[T]], max_retries: int = LLM_MAX_RETRIES) -> T:
+    """Run attempt() under the per-attempt timeout, retrying transient failures"""
+    for retry in range(max_retries + 1):
+        try:
+            return await asyncio.wait_for(attempt(), timeout=LLM_ATTEMPT_TIMEOUT_SECONDS)
+        except Exception as e:
+            if not is_retryable(e) or retry == max_retries:
+                raise
+
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after and retry_after > LLM_MAX_RETRY_AFTER_SECONDS:
+                raise
+
+            delay = backoff_delay(retry, retry_after)
+            logger.warning(f"LLM call failed ({type(e).__name__}: {str(e)}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def _first_delta(stream: AsyncIterator[str]) -> Optional[str]:
+    """Wait for a stream's first text delta, None if it ended empty"""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _discard(task: asyncio.Task, stream: AsyncIterator[str]) -> None:
+    """Cancel a losing attempt and release its connection and limiter slot"""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await stream.aclose()
+
+
+async def open_hedged(open_stream: Callable[[asyncio.Future], AsyncIterator[str]], hedge: bool = LLM_HEDGE_ENABLED) -> Tuple[Optional[str], AsyncIterator[str]]:
+    """
+    Start a completion stream and wait for its first delta.
+
+    open_stream is passed a future it must resolve with the monotonic time
+    the call was admitted by the limiter. Time spent queueing for a slot is
+    not upstream latency, so the hedge clock and the recorded first-token
+    latency both start at admission.
+
+    If no token has arrived by the p95 first-token latency, an identical
+    second request is fired and whichever produces a token first wins; the
+    other is cancelled. No hedge is sent while other calls are waiting for
+    a slot, since it would only add to the queue. Returns the first delta
+    and the winning stream.
+    """
+    loop = asyncio.get_running_loop()
+    attempts = []
+
+    def launch() -> asyncio.Task:
+        admitted = loop.create_future()
+        stream = open_stream(admitted)
+        task = asyncio.ensure_future(_first_delta(stream))
+        attempts.append((task, stream, admitted))
+        return task
+
+    winner = None
+    try:
+        first = launch()
+        if hedge:
+            admitted = attempts[0][2]
+            # Queueing for a slot does not count toward the hedge delay
+            await asyncio.wait({first, admitted}, return_when=asyncio.FIRST_COMPLETED)
+            if not first.done():
+                elapsed = time.monotonic() - admitted.result()
+                done, _ = await asyncio.wait({first}, timeout=max(first_token_latency.hedge_after() - elapsed, 0))
+
+                if not done:
+                    if llm_limiter.waiting:
+                        logger.info("No first token by the p95 threshold, not hedging while calls are queued")
+                    else:
+                        logger.info("No first token by the p95 threshold, sending a hedge request")
+                        launch()
+
+        pending = {task for task, _, _ in attempts}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    break
+                error = task.exception()
+            if winner:
+                break
+
+        if winner is None:
+            raise error
+
+        stream, admitted = next((stream, admitted) for task, stream, admitted in attempts if task is winner)
+        if admitted.done():
+            first_token_latency.record(time.monotonic() - admitted.result())
+        return winner.result(), stream
+
+    finally:
+        for task, stream, _ in attempts:
+            if task is not winner:
+                await _discard(task, stream)
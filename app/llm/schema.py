@@ -0,0 +1,75 @@
+# schema.py
+from typing import Any, Optional
+
+from pydantic import ValidationError
+
+from app.models import PageSpecResponse, SectionData
+from .prompts import SECTION_SKELETONS
+
+
+def _skeleton_schema(example: Any) -> dict:
+    """JSON schema for a section skeleton, typed from its example values"""
+    if isinstance(example, dict):
+        return {
+            "type": "object",
+            "properties": {key: _skeleton_schema(value) for key, value in example.items()},
+            "required": list(example)
+        }
+    if isinstance(example, list):
+        return {"type": "array", "items": _skeleton_schema(example[0]) if example else {}}
+    if isinstance(example, bool):
+        return {"type": "boolean"}
+    if isinstance(example, int):
+        return {"type": "integer"}
+    return {"type": "string"}
+
+
+def _page_spec_schema() -> dict:
+    """The generated part of PageSpecResponse; pageId and context are set server-side"""
+    schema = PageSpecResponse.model_json_schema()
+    return {
+        "type": "object",
+        "properties": {key: schema["properties"][key] for key in ("version", "sections")},
+        "required": ["version", "sections"],
+        "$defs": schema["$defs"]
+    }
+
+
+def _section_schema(section_type: str) -> dict:
+    """SectionData with its data narrowed to the section type's skeleton"""
+    schema = SectionData.model_json_schema()
+    if section_type in SECTION_SKELETONS:
+        schema["properties"]["data"] = _skeleton_schema(SECTION_SKELETONS[section_type])
+    return schema
+
+
+def _response_format(name: str, schema: dict) -> dict:
+    # Not strict: strict mode rejects the free-form section data objects
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": False}}
+
+
+PAGE_SPEC_RESPONSE_FORMAT = _response_format("page_spec", _page_spec_schema())
+SECTION_RESPONSE_FORMATS = {
+    section_type: _response_format(f"{section_type}_section", _section_schema(section_type))
+    for section_type in SECTION_SKELETONS
+}
+JSON_OBJECT_RESPONSE_FORMAT = {"type": "json_object"}
+
+
+def section_response_format(section_type: str) -> dict:
+    return SECTION_RESPONSE_FORMATS.get(section_type) or _response_format("section", _section_schema(section_type))
+
+
+def section_error(section: Any) -> Optional[str]:
+    """Why a generated section is unusable, or None if it is valid"""
+    try:
+        SectionData.model_validate(section)
+    except ValidationError as e:
+        return f"invalid section: {e.errors()[0]['msg']}"
+
+    skeleton = SECTION_SKELETONS.get(section["type"])
+    if skeleton:
+        missing = [field for field in skeleton if field not in section["data"]]
+        if missing:
+            return f"missing fields: {', '.join(missing)}"
+    return None
@@ -0,0 +1,73 @@
+# streaming.py
+import re
+import json
+from typing import List
+
+SECTIONS_ARRAY_START = re.compile(r'"sections"\s*:\s*\[')
+
+
+class SectionStreamParser:
+    """
+    Incrementally pull complete section objects out of a streamed page spec.
+
+    Feed it text deltas as they arrive; each call returns the sections whose
+    closing brace was seen in that delta. The full text is kept so the whole
+    spec can be parsed once the stream ends.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.sections: List[dict] = []
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = None
+
+    def feed(self, text: str) -> List[dict]:
+        self.buffer += text
+        completed = []
+
+        if not self._in_array:
+            match = SECTIONS_ARRAY_START.search(self.buffer)
+            if not match:
+                return completed
+            self._in_array = True
+            self._pos = match.end()
+
+        while self._pos < len(self.buffer) and not self._done:
+            char = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the sections array itself
+                    self._done = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._start is not None:
+                        try:
+                            section = json.loads(self.buffer[self._start:self._pos + 1])
+                            completed.append(section)
+                        except json.JSONDecodeError:
+                            pass
+                        self._start = None
+
+            self._pos += 1
+
+        self.sections.extend(completed)
+        return completed
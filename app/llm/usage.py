@@ -0,0 +1,39 @@
+# usage.py
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class UsageStats:
+    """Running totals of the token usage Azure reports, per prompt prefix"""
+
+    def __init__(self):
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, prompt_name: str, usage: Any) -> None:
+        """Add one completion's usage block (prompt, cached and completion tokens)"""
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+
+        totals = self.totals.setdefault(prompt_name, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0
+        })
+        totals["calls"] += 1
+        totals["prompt_tokens"] += usage.prompt_tokens or 0
+        totals["cached_tokens"] += cached
+        totals["completion_tokens"] += usage.completion_tokens or 0
+
+        logger.debug(f"LLM usage ({prompt_name}): {usage.prompt_tokens} prompt tokens, {cached} cached, {usage.completion_tokens} completion")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                **totals,
+                "cached_ratio": round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0
+            }
+            for name, totals in self.totals.items()
+        }
+
+
+llm_usage = UsageStats()
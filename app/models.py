@@ -9,13 +9,35 @@ class GeneratePageRequest(BaseModel):
     target_audience: str = Field(..., min_length=1, max_length=200)
     brand_tone: str = Field(..., min_length=1, max_length=200)
     website_url: Optional[str] = None
+    use_cache: bool = True
+    # "single": one completion for the whole page, "parallel": one per section
+    mode: str = Field("single", pattern="^(single|parallel)$")
+
+class BulkGeneratePageRequest(BaseModel):
+    variants: List[GeneratePageRequest] = Field(..., min_length=1, max_length=100)
 
 class EditSectionRequest(BaseModel):
     section_id: str
     data: Dict[str, Any]
+    # Alternative to the If-Match header for optimistic concurrency
+    expected_version: Optional[int] = None
+    # regenerate-section only: crawl the site again instead of reusing the stored context
+    recrawl: bool = False
+
+class RegenerateSectionsRequest(BaseModel):
+    section_ids: List[str] = Field(..., min_length=1, max_length=20)
+    # Overrides for the stored user context (and optionally a different url)
+    context: Dict[str, Any] = {}
+    recrawl: bool = False
+    expected_version: Optional[int] = None
 
 class ReorderSectionsRequest(BaseModel):
     sections: List[Dict[str, Any]]
+    expected_version: Optional[int] = None
+
+class RollbackRequest(BaseModel):
+    version: int
+    expected_version: Optional[int] = None
 
 class PublishPageRequest(BaseModel):
     page_id: str
@@ -38,6 +60,7 @@ class PublishResponse(BaseModel):
     version: int
     url: str
     message: str
+    snapshot_url: Optional[str] = None
 
 # Database Models (MongoDB documents)
 class PageDocument(BaseModel):
@@ -50,7 +73,8 @@ class PageDocument(BaseModel):
     published: bool = False
     # NEW: Store context for regeneration
     user_context: Dict[str, str] = {}
-    crawled_context: Optional[str] = None
+    # sha256 of the crawled context, stored once in brand_contexts
+    context_ref: Optional[str] = None
 
     class Config:
         json_schema_extra = {
@@ -68,6 +92,6 @@ class PageDocument(BaseModel):
                     "target_audience": "Developers",
                     "brand_tone": "Modern"
                 },
-                "crawled_context": None
+                "context_ref": None
             }
         }
\ No newline at end of file
@@ -0,0 +1,43 @@
+# page_cache.py
+import os
+import itertools
+from typing import Optional
+
+from app.cache import TTLCache
+
+# Short TTL bounds staleness across workers, since invalidation is per process
+PAGE_CACHE_TTL_SECONDS = int(os.getenv("PAGE_CACHE_TTL_SECONDS", "30"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "1024"))
+
+# Serialized PageSpecResponse payloads by page_id; each entry is one (page_id, version)
+page_cache = TTLCache(max_size=PAGE_CACHE_MAX_ENTRIES, ttl_seconds=PAGE_CACHE_TTL_SECONDS)
+
+# When each page was last invalidated, so a read that raced a write is not cached
+_clock = itertools.count()
+_invalidated_at = TTLCache(max_size=PAGE_CACHE_MAX_ENTRIES * 4, ttl_seconds=PAGE_CACHE_TTL_SECONDS * 2)
+
+
+def get_cached_page(page_id: str) -> Optional[dict]:
+    """Return {"version", "etag", "body"} for a cached page, if any"""
+    return page_cache.get(page_id)
+
+
+def read_token() -> int:
+    """Take before reading a page from the database; pass to cache_page"""
+    return next(_clock)
+
+
+def cache_page(page_id: str, version: int, etag: str, body: bytes, token: int) -> dict:
+    """Cache a serialized page unless it was invalidated after the read began"""
+    entry = {"version": version, "etag": etag, "body": body}
+
+    invalidated = _invalidated_at.get(page_id)
+    if invalidated is None or invalidated < token:
+        page_cache.set(page_id, entry)
+    return entry
+
+
+def invalidate_page(page_id: str) -> None:
+    """Drop a page after any write to it"""
+    page_cache.pop(page_id)
+    _invalidated_at.set(page_id, next(_clock))
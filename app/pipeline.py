@@ -0,0 +1,269 @@
+# pipeline.py
+import os
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.models import GeneratePageRequest
+from app.llm.generator import generate_page_spec, crawler
+from app.db import save_page, save_pages, save_brand_context
+from app.crawl_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Variants of a bulk request generated at the same time
+BULK_GENERATE_CONCURRENCY = int(os.getenv("BULK_GENERATE_CONCURRENCY", "8"))
+# Finished variants are saved in chunks of this size, or once the oldest waited this long
+BULK_SAVE_BATCH_SIZE = int(os.getenv("BULK_SAVE_BATCH_SIZE", "10"))
+BULK_SAVE_INTERVAL_SECONDS = float(os.getenv("BULK_SAVE_INTERVAL_SECONDS", "2"))
+
+
+def user_input_from_request(request: GeneratePageRequest) -> dict:
+    """User fields that drive generation and are stored for regeneration"""
+    return {
+        "industry": request.industry,
+        "offer": request.offer,
+        "target_audience": request.target_audience,
+        "brand_tone": request.brand_tone
+    }
+
+
+async def crawl_brand_context(website_url: Optional[str]) -> Tuple[Optional[str], Optional[datetime]]:
+    """
+    Crawl a website for brand context
+
+    Returns:
+        (crawled_context, crawled_at), or (None, None) if no URL or the crawl failed
+    """
+    if not website_url:
+        return None, None
+
+    logger.info(f"Crawling website: {website_url}")
+    crawled_context, crawled_at = await crawler.crawl_with_time(website_url)
+    if crawled_context:
+        logger.info("✓ Website crawled successfully")
+    else:
+        logger.warning("Website crawl failed, proceeding without brand context")
+    return crawled_context, crawled_at
+
+
+async def generate_and_save_page(request: GeneratePageRequest, timings: Optional[Dict[str, int]] = None) -> dict:
+    """
+    Crawl, generate and save one landing page
+
+    Args:
+        request: the generation request
+        timings: if given, filled with per-stage durations in milliseconds
+
+    Returns:
+        dict: the saved page spec
+    """
+    timings = timings if timings is not None else {}
+    started = time.perf_counter()
+
+    def mark(stage: str, since: float) -> float:
+        now = time.perf_counter()
+        timings[f"{stage}_ms"] = int((now - since) * 1000)
+        return now
+
+    user_input = user_input_from_request(request)
+
+    # Crawl website if URL provided
+    crawled_context, crawled_at = await crawl_brand_context(request.website_url)
+    stage_start = mark("crawl", started)
+
+    # Generate page spec from LLM (with or without crawled context)
+    page_spec = await generate_page_spec(
+        user_input,
+        crawled_context,
+        use_cache=request.use_cache,
+        mode=request.mode
+    )
+    stage_start = mark("generate", stage_start)
+
+    # Assign unique ID if not present
+    if "pageId" not in page_spec:
+        page_spec["pageId"] = f"landing-{uuid.uuid4().hex[:8]}"
+
+    if "version" not in page_spec:
+        page_spec["version"] = 1
+
+    # Save to database WITH context (for regeneration)
+    await save_page(
+        page_spec,
+        user_context=user_input,
+        crawled_context=crawled_context,
+        website_url=request.website_url,
+        crawled_at=crawled_at
+    )
+    mark("save", stage_start)
+    mark("total", started)
+
+    return page_spec
+
+
+async def regeneration_context(page: dict, recrawl: bool = False, website_url: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Brand context for regenerating a section of a stored page
+    
+    The context stored with the page is reused. The site is only crawled
+    again (through the crawl cache, so usually a conditional request) when
+    the caller asks for it, names a different URL, or the stored crawl is
+    older than the crawl cache TTL.
+    
+    Returns:
+        (crawled_context, context_ref) where context_ref is set only if the
+        page should now point at a different stored context
+    """
+    crawled_context = page.get("crawled_context")
+    stored_url = page.get("crawled_url")
+    url = website_url or stored_url
+    
+    crawled_at = page.get("crawled_at")
+    stale = bool(crawler.cache and crawled_at and datetime.utcnow() - crawled_at >= crawler.cache.ttl)
+    
+    if not url or not (recrawl or url != stored_url or stale):
+        return crawled_context, None
+    
+    logger.info(f"Re-crawling {url} for section regeneration")
+    fresh_context, crawled_at = await crawler.crawl_with_time(url, refresh=recrawl)
+    if not fresh_context:
+        logger.warning("Re-crawl failed, keeping the stored brand context")
+        return crawled_context, None
+    
+    context_ref = await save_brand_context(fresh_context, url, crawled_at)
+    return fresh_context, (context_ref if context_ref != page.get("context_ref") else None)
+
+
+async def generate_pages_bulk(requests: List[GeneratePageRequest], concurrency: int = BULK_GENERATE_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Generate many page variants, yielding progress events as they happen
+    
+    Each distinct website is crawled once and shared by its variants, and
+    the LLM calls run in a pool of `concurrency`. Finished pages are saved
+    with insert_many in chunks of BULK_SAVE_BATCH_SIZE, or after
+    BULK_SAVE_INTERVAL_SECONDS, and a variant's "generated" event is only
+    sent once its page is stored. If the consumer stops early the remaining
+    work is cancelled and the pages already finished are still saved.
+    
+    Yields:
+        dict: "start", one "crawled" per distinct URL, one "generated" or
+        "failed" per variant (by index), then "done" with the saved pageIds
+    """
+    total = len(requests)
+    yield {"event": "start", "total": total}
+    
+    events: asyncio.Queue = asyncio.Queue()
+    crawls: Dict[str, asyncio.Future] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    # Finished but not yet saved, by variant index
+    unsaved: Dict[int, dict] = {}
+    saved_ids: List[str] = []
+    
+    async def crawl(url: str) -> Tuple[Optional[str], Optional[datetime]]:
+        crawled_context, crawled_at = await crawl_brand_context(url)
+        events.put_nowait({"event": "crawled", "url": url, "ok": crawled_context is not None})
+        return crawled_context, crawled_at
+    
+    def crawl_once(url: str) -> asyncio.Future:
+        key = normalize_url(url)
+        if key not in crawls:
+            crawls[key] = asyncio.ensure_future(crawl(url))
+        return crawls[key]
+    
+    async def generate(index: int, request: GeneratePageRequest) -> None:
+        try:
+            crawled_context, crawled_at = await crawl_once(request.website_url) if request.website_url else (None, None)
+            user_input = user_input_from_request(request)
+            
+            async with semaphore:
+                page_spec = await generate_page_spec(
+                    user_input,
+                    crawled_context,
+                    use_cache=request.use_cache,
+                    mode=request.mode
+                )
+            page_spec.setdefault("version", 1)
+            
+            events.put_nowait({"event": "finished", "index": index, "page": {
+                "page_spec": page_spec,
+                "user_context": user_input,
+                "crawled_context": crawled_context,
+                "crawled_at": crawled_at,
+                "website_url": request.website_url
+            }})
+        except Exception as e:
+            logger.warning(f"Bulk variant {index} failed: {str(e)}")
+            events.put_nowait({"event": "failed", "index": index, "detail": str(e)})
+    
+    async def save_unsaved() -> List[dict]:
+        """Save the finished pages, returning their "generated" or "failed" events"""
+        batch = dict(unsaved)
+        unsaved.clear()
+        if not batch:
+            return []
+        try:
+            # Shielded so a disconnect mid-save does not lose the batch
+            await asyncio.shield(save_pages(list(batch.values())))
+        except Exception as e:
+            logger.error(f"Saving {len(batch)} bulk variants failed: {str(e)}")
+            return [
+                {"event": "failed", "index": index, "detail": f"Failed to save generated page: {str(e)}"}
+                for index in batch
+            ]
+        saved_ids.extend(page["page_spec"]["pageId"] for page in batch.values())
+        return [
+            {"event": "generated", "index": index, "pageId": page["page_spec"]["pageId"]}
+            for index, page in batch.items()
+        ]
+    
+    tasks = [asyncio.ensure_future(generate(index, request)) for index, request in enumerate(requests)]
+    loop = asyncio.get_running_loop()
+    
+    try:
+        finished = 0
+        oldest_unsaved = None
+        while finished < total:
+            timeout = max(oldest_unsaved + BULK_SAVE_INTERVAL_SECONDS - loop.time(), 0) if unsaved else None
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                event = None
+            
+            if event and event["event"] == "finished":
+                if not unsaved:
+                    oldest_unsaved = loop.time()
+                unsaved[event["index"]] = event["page"]
+                finished += 1
+            elif event:
+                if event["event"] == "failed":
+                    finished += 1
+                yield event
+            
+            if unsaved and (event is None or len(unsaved) >= BULK_SAVE_BATCH_SIZE):
+                for saved_event in await save_unsaved():
+                    yield saved_event
+        
+        for saved_event in await save_unsaved():
+            yield saved_event
+    finally:
+        for task in tasks + list(crawls.values()):
+            task.cancel()
+        # Stopped early: keep the LLM work already done, including pages
+        # whose events were not read yet
+        while not events.empty():
+            event = events.get_nowait()
+            if event["event"] == "finished":
+                unsaved[event["index"]] = event["page"]
+        if unsaved:
+            await save_unsaved()
+    
+    yield {
+        "event": "done",
+        "saved": len(saved_ids),
+        "failed": total - len(saved_ids),
+        "pageIds": saved_ids
+    }
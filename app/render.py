@@ -0,0 +1,167 @@
+# render.py
+import re
+from html import escape
+from typing import Callable, Dict, List
+
+COLOR_PATTERN = re.compile(r"^#[0-9a-fA-F]{3,8}$")
+
+BASE_CSS = """
+body{margin:0;font-family:system-ui,-apple-system,Segoe UI,Roboto,sans-serif;color:#1a1a1a;line-height:1.5}
+section{padding:64px 24px}.wrap{max-width:1080px;margin:0 auto}
+h1{font-size:3rem;margin:0 0 16px}h2{font-size:2rem;margin:0 0 24px}
+.hero{background-size:cover;background-position:center;text-align:center;padding:120px 24px}
+.cta,button{display:inline-block;padding:14px 28px;border:0;border-radius:6px;background:#2563eb;color:#fff;font-size:1rem;text-decoration:none}
+.grid{display:grid;gap:24px;grid-template-columns:repeat(auto-fit,minmax(240px,1fr))}
+.card{padding:24px;border-radius:8px;background:#f9fafb}.icon{font-size:2rem}
+blockquote{margin:0 0 12px;font-style:italic}details{padding:16px 0;border-bottom:1px solid #e5e7eb}
+form{display:grid;gap:12px;max-width:480px}input,textarea{padding:10px;border:1px solid #d1d5db;border-radius:6px}
+footer{padding:32px 24px;background:#111827;color:#d1d5db}footer a{color:#d1d5db;margin-right:16px}
+""".strip()
+
+
+def _text(value) -> str:
+    return escape(str(value)) if value is not None else ""
+
+
+def _color(value, default: str) -> str:
+    """Only pass through plain hex colors into inline styles"""
+    return value if isinstance(value, str) and COLOR_PATTERN.match(value) else default
+
+
+def _url(value, default: str = "#") -> str:
+    """Only allow http(s) and site-relative URLs in links and images"""
+    if isinstance(value, str) and value.startswith(("https://", "http://", "/")):
+        return escape(value, quote=True)
+    return default
+
+
+# Characters that could close a quoted CSS url() or break out of it
+_CSS_URL_UNSAFE = re.compile(r"""['"()\\\s]""")
+
+
+def _css_url(value) -> str:
+    """A URL for url('...') in an inline style, or "" if it is not allowed"""
+    if not isinstance(value, str) or not value.startswith(("https://", "http://", "/")):
+        return ""
+    value = _CSS_URL_UNSAFE.sub(lambda match: "%{:02X}".format(ord(match.group())), value)
+    return escape(value, quote=True)
+
+
+def _stars(value) -> str:
+    try:
+        return "★" * max(0, min(int(value), 5))
+    except (TypeError, ValueError):
+        return ""
+
+
+def _render_hero(data: Dict) -> str:
+    style = f"color:{_color(data.get('textColor'), '#FFFFFF')};background-color:{_color(data.get('backgroundColor'), '#1a1a1a')}"
+    image = _css_url(data.get("backgroundImage"))
+    if image:
+        style += f";background-image:url('{image}')"
+    return (
+        f'<section class="hero" style="{style}"><div class="wrap">'
+        f'<h1>{_text(data.get("headline"))}</h1>'
+        f'<p>{_text(data.get("subheadline"))}</p>'
+        f'<a class="cta" href="#contact">{_text(data.get("ctaText"))}</a>'
+        f'</div></section>'
+    )
+
+
+def _render_features(data: Dict) -> str:
+    items = "".join(
+        f'<div class="card"><div class="icon">{_text(item.get("icon"))}</div>'
+        f'<h3>{_text(item.get("title"))}</h3><p>{_text(item.get("description"))}</p></div>'
+        for item in data.get("items", [])
+    )
+    return (
+        f'<section class="features"><div class="wrap"><h2>{_text(data.get("title"))}</h2>'
+        f'<p>{_text(data.get("description"))}</p><div class="grid">{items}</div></div></section>'
+    )
+
+
+def _render_testimonials(data: Dict) -> str:
+    items = "".join(
+        f'<div class="card"><blockquote>{_text(item.get("quote"))}</blockquote>'
+        f'<p>{_stars(item.get("rating"))}</p>'
+        f'<p><strong>{_text(item.get("author"))}</strong>, {_text(item.get("role"))} · {_text(item.get("company"))}</p></div>'
+        for item in data.get("items", [])
+    )
+    return (
+        f'<section class="testimonials"><div class="wrap"><h2>{_text(data.get("title"))}</h2>'
+        f'<div class="grid">{items}</div></div></section>'
+    )
+
+
+def _render_faq(data: Dict) -> str:
+    items = "".join(
+        f'<details><summary>{_text(item.get("question"))}</summary><p>{_text(item.get("answer"))}</p></details>'
+        for item in data.get("items", [])
+    )
+    return f'<section class="faq"><div class="wrap"><h2>{_text(data.get("title"))}</h2>{items}</div></section>'
+
+
+def _render_contact(data: Dict) -> str:
+    fields = []
+    for field in data.get("fields", []):
+        name = _text(field.get("name"))
+        required = " required" if field.get("required") else ""
+        if field.get("type") == "textarea":
+            control = f'<textarea name="{name}"{required}></textarea>'
+        else:
+            control = f'<input type="{_text(field.get("type") or "text")}" name="{name}"{required}>'
+        fields.append(f'<label>{_text(field.get("label"))}{control}</label>')
+
+    return (
+        f'<section id="contact" class="contact" style="background-color:{_color(data.get("backgroundColor"), "#f9fafb")}">'
+        f'<div class="wrap"><h2>{_text(data.get("title"))}</h2><p>{_text(data.get("description"))}</p>'
+        f'<form method="post">{"".join(fields)}<button type="submit">{_text(data.get("submitText"))}</button></form>'
+        f'</div></section>'
+    )
+
+
+def _render_footer(data: Dict) -> str:
+    links = "".join(
+        f'<a href="{_url(link.get("url"))}">{_text(link.get("label"))}</a>'
+        for link in data.get("links", [])
+    )
+    social = "".join(
+        f'<a href="{_url(link.get("url"))}" rel="noopener">{_text(link.get("platform"))}</a>'
+        for link in data.get("socialLinks", [])
+    )
+    return (
+        f'<footer><div class="wrap"><nav>{links}</nav><nav>{social}</nav>'
+        f'<p>{_text(data.get("copyright"))}</p></div></footer>'
+    )
+
+
+SECTION_RENDERERS: Dict[str, Callable[[Dict], str]] = {
+    "hero": _render_hero,
+    "features": _render_features,
+    "testimonials": _render_testimonials,
+    "faq": _render_faq,
+    "contact": _render_contact,
+    "footer": _render_footer,
+}
+
+
+def render_page_html(page_id: str, sections: List[Dict]) -> str:
+    """Render a page's sections to a standalone HTML document"""
+    title = page_id
+    body = []
+
+    for section in sorted(sections, key=lambda s: s.get("order", 0)):
+        renderer = SECTION_RENDERERS.get(section.get("type"))
+        if not renderer:
+            continue
+        data = section.get("data") or {}
+        if section.get("type") == "hero" and data.get("headline"):
+            title = data["headline"]
+        body.append(renderer(data))
+
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width,initial-scale=1">'
+        f'<title>{_text(title)}</title><style>{BASE_CSS}</style></head>'
+        f'<body>{"".join(body)}</body></html>'
+    )
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, HTTPException, Response, status
+from app.models import GeneratePageRequest
+from app.jobs import job_queue
+from app.db import get_job
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _job_response(job: dict) -> dict:
+    """Public view of a job document"""
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "jobId": job["job_id"],
+        "status": job["status"],
+        "createdAt": iso(job.get("created_at")),
+        "startedAt": iso(job.get("started_at")),
+        "finishedAt": iso(job.get("finished_at")),
+        "attempts": job.get("attempts", 0),
+        "timings": job.get("timings") or {},
+        "result": job.get("result"),
+        "error": job.get("error")
+    }
+
+
+@router.post("/pages/generate/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_generation_job(request: GeneratePageRequest, response: Response):
+    """
+    Queue a landing page generation and return immediately
+
+    Returns:
+        dict: The queued job; poll Location (/api/jobs/{jobId}) for status
+    """
+    try:
+        job = await job_queue.submit(request.model_dump())
+
+        response.headers["Location"] = f"/api/jobs/{job['job_id']}"
+        return _job_response(job)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to queue generation: {str(e)}"
+        )
+
+
+@router.get("/jobs/{job_id}")
+async def get_generation_job(job_id: str):
+    """
+    Report a background job's status, timings and result
+
+    Args:
+        job_id: The job ID
+
+    Returns:
+        dict: Job status; result holds pageId and version once succeeded
+    """
+    try:
+        job = await get_job(job_id)
+
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Job {job_id} not found"
+            )
+
+        return _job_response(job)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve job: {str(e)}"
+        )
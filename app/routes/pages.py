@@ -1,23 +1,115 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from app.models import (
     GeneratePageRequest,
+    BulkGeneratePageRequest,
     EditSectionRequest,
+    RegenerateSectionsRequest,
     ReorderSectionsRequest,
+    RollbackRequest,
     PublishPageRequest,
     PageSpecResponse,
     PublishResponse
 )
-from app.llm.generator import generate_page_spec, regenerate_section
-from app.db import save_page, get_page, update_page, publish_page, delete_page
-from app.crawler import WebCrawler
-import uuid
+from app.llm.generator import stream_page_spec, regenerate_section
+from app.llm.limiter import LLMOverloadedError
+from app.pipeline import (
+    generate_and_save_page,
+    generate_pages_bulk,
+    crawl_brand_context,
+    user_input_from_request,
+    regeneration_context
+)
+from app.db import (
+    VersionConflictError,
+    save_page,
+    get_page,
+    page_exists,
+    update_page,
+    update_section,
+    update_sections,
+    publish_page,
+    delete_page,
+    save_published_snapshot,
+    list_page_versions,
+    get_page_version
+)
+from app.snapshots import build_snapshot, remember_snapshot, forget_snapshots
+from app.transfer import export_records, import_records, encode_record
+from app.page_cache import get_cached_page, cache_page, read_token
+from typing import Optional
+import os
+import json
+import math
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
-crawler = WebCrawler()
 
 router = APIRouter()
 
+# Concurrent LLM calls per batch regeneration request
+REGENERATE_BATCH_CONCURRENCY = int(os.getenv("REGENERATE_BATCH_CONCURRENCY", "4"))
+
+def _etag(version: int) -> str:
+    """Strong ETag for a page version"""
+    return f'"v{version}"'
+
+def _expected_version(if_match: Optional[str], body_version: Optional[int] = None) -> Optional[int]:
+    """Resolve the version a write is conditional on, from If-Match or the body"""
+    if not if_match or if_match.strip() == "*":
+        return body_version
+    
+    tag = if_match.split(",")[0].strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"').lstrip("v")
+    
+    try:
+        return int(tag)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid If-Match header: {if_match}"
+        )
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against a strong ETag"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def _conflict(e: VersionConflictError) -> HTTPException:
+    """409 response for a write against a stale page version"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": str(e),
+            "page_id": e.page_id,
+            "expected_version": e.expected_version,
+            "current_version": e.current_version
+        },
+        headers={"ETag": _etag(e.current_version)}
+    )
+
+def _overloaded(e: LLMOverloadedError) -> HTTPException:
+    """503 response telling the client when the model will have capacity again"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(math.ceil(e.retry_after))}
+    )
+
+def _merge_user_context(page: dict, overrides: dict) -> dict:
+    """Stored user context with any fields the caller overrides"""
+    return {**(page.get("user_context") or {}), **{key: value for key, value in overrides.items() if value}}
+
+def _ndjson(event: dict) -> bytes:
+    """Encode one event as a newline-delimited JSON line"""
+    return (json.dumps(event, default=str) + "\n").encode("utf-8")
+
 @router.post("/pages/generate", response_model=PageSpecResponse)
 async def generate_landing_page(request: GeneratePageRequest):
     """
@@ -28,39 +120,7 @@ async def generate_landing_page(request: GeneratePageRequest):
         PageSpecResponse: Generated page specification
     """
     try:
-        user_input = {
-            "industry": request.industry,
-            "offer": request.offer,
-            "target_audience": request.target_audience,
-            "brand_tone": request.brand_tone
-        }
-        
-        # Crawl website if URL provided
-        crawled_context = None
-        if request.website_url:
-            logger.info(f"Crawling website: {request.website_url}")
-            crawled_context = crawler.crawl_website(request.website_url)
-            if crawled_context:
-                logger.info("✓ Website crawled successfully")
-            else:
-                logger.warning("Website crawl failed, proceeding without brand context")
-        
-        # Generate page spec from LLM (with or without crawled context)
-        page_spec = generate_page_spec(user_input, crawled_context)
-        
-        # Assign unique ID if not present
-        if "pageId" not in page_spec:
-            page_spec["pageId"] = f"landing-{uuid.uuid4().hex[:8]}"
-        
-        if "version" not in page_spec:
-            page_spec["version"] = 1
-        
-        # Save to database WITH context (for regeneration)
-        saved = save_page(
-            page_spec,
-            user_context=user_input,
-            crawled_context=crawled_context
-        )
+        page_spec = await generate_and_save_page(request)
         
         return PageSpecResponse(
             pageId=page_spec["pageId"],
@@ -73,23 +133,109 @@ async def generate_landing_page(request: GeneratePageRequest):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid request: {str(e)}"
         )
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate landing page: {str(e)}"
         )
+
+
+@router.post("/pages/generate/stream")
+async def generate_landing_page_stream(request: GeneratePageRequest):
+    """
+    Generate a new landing page, streaming sections as NDJSON
+    
+    Emits a "start" event with the pageId, a "section" event as each
+    section is completed by the model (hero first), then a "done" event
+    once the full page has been saved. Failures are sent as an "error" event.
+    
+    Returns:
+        StreamingResponse: application/x-ndjson event stream
+    """
+    user_input = user_input_from_request(request)
+    
+    async def event_stream():
+        try:
+            crawled_context, crawled_at = await crawl_brand_context(request.website_url)
+            
+            async for event in stream_page_spec(user_input, crawled_context):
+                if event["event"] != "page":
+                    yield _ndjson(event)
+                    continue
+                
+                page_spec = event["page_spec"]
+                await save_page(
+                    page_spec,
+                    user_context=user_input,
+                    crawled_context=crawled_context,
+                    website_url=request.website_url,
+                    crawled_at=crawled_at
+                )
+                yield _ndjson({
+                    "event": "done",
+                    "pageId": page_spec["pageId"],
+                    "version": page_spec["version"],
+                    "sectionCount": len(page_spec.get("sections", []))
+                })
+        except LLMOverloadedError as e:
+            yield _ndjson({"event": "error", "detail": str(e), "retryAfter": math.ceil(e.retry_after)})
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {str(e)}")
+            yield _ndjson({"event": "error", "detail": f"Failed to generate landing page: {str(e)}"})
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.post("/pages/generate/bulk")
+async def generate_landing_pages_bulk(request: BulkGeneratePageRequest):
+    """
+    Generate many landing page variants, streaming progress as NDJSON
     
+    Each distinct website_url is crawled once for all its variants and the
+    LLM calls run in a bounded pool. Finished pages are saved in chunks,
+    and a variant's "generated" event is sent once its page is stored.
+    Emits "start", "crawled" per URL, "generated" or "failed" per variant
+    index, then "done". Disconnecting cancels the remaining variants; the
+    ones already finished are still saved.
+    
+    Returns:
+        StreamingResponse: application/x-ndjson event stream
+    """
+    async def event_stream():
+        try:
+            async for event in generate_pages_bulk(request.variants):
+                yield _ndjson(event)
+        except Exception as e:
+            logger.error(f"Bulk generation failed: {str(e)}")
+            yield _ndjson({"event": "error", "detail": f"Failed to save generated pages: {str(e)}"})
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @router.get("/pages", response_model=list)
-async def list_pages():
+async def list_pages(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None
+):
     """
-    Retrieve all saved pages
+    Retrieve saved pages, newest first, one page of results at a time
+    
+    Args:
+        limit: Maximum number of summaries to return
+        cursor: Value of X-Next-Cursor from the previous response
+        user_id: Only list pages owned by this user
     
     Returns:
-        list: List of page summaries
+        list: List of page summaries; X-Next-Cursor is set if more remain
     """
     try:
         from app.db import get_all_pages
-        pages = get_all_pages()
+        pages, next_cursor = await get_all_pages(user_id=user_id, limit=limit, cursor=cursor)
+        
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         return [{
             "pageId": page["page_id"],
@@ -100,44 +246,120 @@ async def list_pages():
             "published": page.get("published", False)
         } for page in pages]
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve pages: {str(e)}"
         )
 
+@router.get("/pages/export")
+async def export_pages(user_id: Optional[str] = None):
+    """
+    Stream every page (optionally one user's) as NDJSON
+    
+    Pages are read from a batched cursor and written as they arrive, so
+    memory stays flat however many pages match. Each brand context is
+    included once, ahead of the first page that uses it.
+    
+    Returns:
+        StreamingResponse: application/x-ndjson, one record per line
+    """
+    async def record_stream():
+        count = 0
+        try:
+            async for record in export_records(user_id):
+                count += record["kind"] == "page"
+                yield encode_record(record)
+        except Exception as e:
+            # Headers are already sent; end with an error record the importer will reject
+            logger.error(f"Export failed after {count} pages: {str(e)}")
+            yield encode_record({"kind": "error", "detail": f"Export failed: {str(e)}"})
+    
+    return StreamingResponse(
+        record_stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="pages.ndjson"'}
+    )
+
+@router.post("/pages/import")
+async def import_pages(request: Request):
+    """
+    Upsert pages from an NDJSON export streamed in the request body
+    
+    The body is parsed line by line and written in bulk batches, so
+    memory stays flat. Pages are matched on page_id; a replaced page gets
+    a version above both its current and its imported one.
+    
+    Returns:
+        dict: Pages and brand contexts written, plus skipped lines
+    """
+    try:
+        return await import_records(request.stream())
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid import: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import pages: {str(e)}"
+        )
+
 @router.get("/pages/{page_id}", response_model=PageSpecResponse)
-async def get_landing_page(page_id: str):
+async def get_landing_page(page_id: str, if_none_match: Optional[str] = Header(None)):
     """
     Retrieve a saved landing page
     
+    Serialized pages are cached in process and invalidated on every write.
+    A matching If-None-Match answers 304 Not Modified.
+    
     Args:
         page_id: The page ID to retrieve
+        if_none_match: ETag from a previous response
     
     Returns:
         PageSpecResponse: The page specification with user context
     """
     try:
-        page = get_page(page_id)
-        
-        if not page:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Page {page_id} not found"
-            )
-        
-        # Include user_context in the response
-        response_data = {
-            "pageId": page["page_id"],
-            "version": page["version"],
-            "sections": page["sections"]
-        }
-        
-        # Add user_context if it exists
-        if "user_context" in page and page["user_context"]:
-            response_data["user_context"] = page["user_context"]
-        
-        return response_data
+        cached = get_cached_page(page_id)
+        
+        if cached is None:
+            token = read_token()
+            page = await get_page(page_id, include_context=False)
+            
+            if not page:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Page {page_id} not found"
+                )
+            
+            # Include user_context in the response
+            response_data = {
+                "pageId": page["page_id"],
+                "version": page["version"],
+                "sections": page["sections"]
+            }
+            
+            # Add user_context if it exists
+            if "user_context" in page and page["user_context"]:
+                response_data["user_context"] = page["user_context"]
+            
+            body = PageSpecResponse(**response_data).model_dump_json().encode("utf-8")
+            cached = cache_page(page_id, page["version"], _etag(page["version"]), body, token)
+        
+        headers = {"ETag": cached["etag"], "Cache-Control": "no-cache"}
+        
+        if if_none_match and _etag_matches(if_none_match, cached["etag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        return Response(content=cached["body"], media_type="application/json", headers=headers)
         
     except HTTPException:
         raise
@@ -148,53 +370,51 @@ async def get_landing_page(page_id: str):
         )
 
 @router.post("/pages/{page_id}/edit-section")
-async def edit_section(page_id: str, request: EditSectionRequest):
+async def edit_section(
+    page_id: str,
+    request: EditSectionRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
     """
     Edit a specific section in a page
     
     Args:
         page_id: The page ID
         request: Updated section data
+        if_match: Optional ETag of the version being edited (409 if stale)
     
     Returns:
         dict: Updated page
     """
     try:
-        page = get_page(page_id)
+        expected_version = _expected_version(if_match, request.expected_version)
         
-        if not page:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Page {page_id} not found"
-            )
-        
-        # Find and update section
-        sections = page["sections"]
-        section_found = False
+        # Single atomic update of just this section
+        new_version = await update_section(page_id, request.section_id, request.data, expected_version)
         
-        for section in sections:
-            if section["id"] == request.section_id:
-                section["data"] = request.data
-                section_found = True
-                break
-        
-        if not section_found:
+        if new_version is None:
+            if not await page_exists(page_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Page {page_id} not found"
+                )
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Section {request.section_id} not found"
             )
         
-        # Update in database
-        updated_page = update_page(page_id, sections)
-        
+        response.headers["ETag"] = _etag(new_version)
         return {
             "message": "Section updated successfully",
             "page_id": page_id,
-            "version": updated_page["version"]
+            "version": new_version
         }
         
     except HTTPException:
         raise
+    except VersionConflictError as e:
+        raise _conflict(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -203,19 +423,30 @@ async def edit_section(page_id: str, request: EditSectionRequest):
 
 
 @router.post("/pages/{page_id}/regenerate-section")
-async def regenerate_section_endpoint(page_id: str, request: EditSectionRequest):
+async def regenerate_section_endpoint(
+    page_id: str,
+    request: EditSectionRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
     """
     Regenerate a section using AI
     
+    Uses the user context and brand context stored with the page, so a
+    regeneration is one LLM call with no crawl. data.context may override
+    user fields or name a different url; recrawl forces a fresh crawl.
+    
     Args:
         page_id: The page ID
-        request: Section ID and context
+        request: Section ID, optional context overrides and recrawl flag
+        if_match: Optional ETag of the version being edited (409 if stale)
     
     Returns:
         dict: Updated page with regenerated section
     """
     try:
-        page = get_page(page_id)
+        expected_version = _expected_version(if_match, request.expected_version)
+        page = await get_page(page_id)
         
         if not page:
             raise HTTPException(
@@ -223,6 +454,10 @@ async def regenerate_section_endpoint(page_id: str, request: EditSectionRequest)
                 detail=f"Page {page_id} not found"
             )
         
+        # Fail fast before spending an LLM call on a stale version
+        if expected_version is not None and page["version"] != expected_version:
+            raise VersionConflictError(page_id, expected_version, page["version"])
+        
         # Find the section
         sections = page["sections"]
         section_to_regenerate = None
@@ -238,27 +473,36 @@ async def regenerate_section_endpoint(page_id: str, request: EditSectionRequest)
                 detail=f"Section {request.section_id} not found"
             )
         
+        # Stored context first, with any fields the caller overrides
+        overrides = request.data.get("context") or {}
+        user_context = _merge_user_context(page, overrides)
+        crawled_context, context_ref = await regeneration_context(page, request.recrawl, overrides.get("url"))
+        
         # Regenerate using LLM
-        user_input = request.data.get("context", {})
-        regenerated = regenerate_section(section_to_regenerate, user_input)
+        regenerated = await regenerate_section(section_to_regenerate, user_context, crawled_context)
         
-        # Update section in page
-        for section in sections:
-            if section["id"] == request.section_id:
-                section["data"] = regenerated["data"]
-                break
+        # Save just this section so concurrent edits to others are kept
+        new_version = await update_section(page_id, request.section_id, regenerated["data"], expected_version, context_ref)
         
-        # Save to database
-        updated_page = update_page(page_id, sections)
+        if new_version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Section {request.section_id} not found"
+            )
         
+        response.headers["ETag"] = _etag(new_version)
         return {
             "message": "Section regenerated successfully",
             "page_id": page_id,
-            "version": updated_page["version"]
+            "version": new_version
         }
         
     except HTTPException:
         raise
+    except VersionConflictError as e:
+        raise _conflict(e)
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -266,30 +510,141 @@ async def regenerate_section_endpoint(page_id: str, request: EditSectionRequest)
         )
 
 
+@router.post("/pages/{page_id}/regenerate-sections")
+async def regenerate_sections_endpoint(
+    page_id: str,
+    request: RegenerateSectionsRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """
+    Regenerate several sections at once using AI
+    
+    The LLM calls run concurrently and every section that succeeds is saved
+    in one write with a single version bump. Sections that fail are reported
+    individually and left unchanged.
+    
+    Args:
+        page_id: The page ID
+        request: Section IDs, optional context overrides and recrawl flag
+        if_match: Optional ETag of the version being edited (409 if stale)
+    
+    Returns:
+        dict: New version and a result per section
+    """
+    try:
+        expected_version = _expected_version(if_match, request.expected_version)
+        page = await get_page(page_id)
+        
+        if not page:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Page {page_id} not found"
+            )
+        
+        # Fail fast before spending LLM calls on a stale version
+        if expected_version is not None and page["version"] != expected_version:
+            raise VersionConflictError(page_id, expected_version, page["version"])
+        
+        sections_by_id = {section["id"]: section for section in page["sections"]}
+        section_ids = list(dict.fromkeys(request.section_ids))
+        
+        user_context = _merge_user_context(page, request.context)
+        crawled_context, context_ref = await regeneration_context(page, request.recrawl, request.context.get("url"))
+        
+        semaphore = asyncio.Semaphore(REGENERATE_BATCH_CONCURRENCY)
+        
+        async def regenerate(section_id: str) -> dict:
+            if section_id not in sections_by_id:
+                return {"section_id": section_id, "status": "not_found"}
+            try:
+                async with semaphore:
+                    regenerated = await regenerate_section(sections_by_id[section_id], user_context, crawled_context)
+                return {"section_id": section_id, "status": "regenerated", "data": regenerated["data"]}
+            except Exception as e:
+                logger.warning(f"Regenerating section {section_id} of {page_id} failed: {str(e)}")
+                return {"section_id": section_id, "status": "failed", "error": str(e), "exception": e}
+        
+        results = await asyncio.gather(*[regenerate(section_id) for section_id in section_ids])
+        
+        section_data = {result["section_id"]: result.pop("data") for result in results if result["status"] == "regenerated"}
+        errors = [result.pop("exception") for result in results if "exception" in result]
+        
+        if not section_data:
+            overloaded = next((e for e in errors if isinstance(e, LLMOverloadedError)), None)
+            if overloaded:
+                raise overloaded
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail={"message": "No section could be regenerated", "results": results}
+            )
+        
+        new_version, missing = await update_sections(page_id, section_data, expected_version, context_ref)
+        
+        if new_version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Page {page_id} not found"
+            )
+        
+        # Removed from the page while the LLM calls ran, so nothing was stored
+        for result in results:
+            if result["section_id"] in missing:
+                result["status"] = "not_found"
+        stored = len(section_data) - len(missing)
+        
+        response.headers["ETag"] = _etag(new_version)
+        return {
+            "message": f"Regenerated {stored} of {len(section_ids)} sections",
+            "page_id": page_id,
+            "version": new_version,
+            "results": results
+        }
+        
+    except HTTPException:
+        raise
+    except VersionConflictError as e:
+        raise _conflict(e)
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to regenerate sections: {str(e)}"
+        )
+
+
 @router.post("/pages/{page_id}/reorder-sections")
-async def reorder_sections(page_id: str, request: ReorderSectionsRequest):
+async def reorder_sections(
+    page_id: str,
+    request: ReorderSectionsRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
     """
     Reorder sections in a page
     
     Args:
         page_id: The page ID
         request: New section order
+        if_match: Optional ETag of the version being edited (409 if stale)
     
     Returns:
         dict: Updated page
     """
     try:
-        page = get_page(page_id)
+        expected_version = _expected_version(if_match, request.expected_version)
         
-        if not page:
+        # Update order
+        updated_page = await update_page(page_id, request.sections, expected_version)
+        
+        if not updated_page:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Page {page_id} not found"
             )
         
-        # Update order
-        updated_page = update_page(page_id, request.sections)
-        
+        response.headers["ETag"] = _etag(updated_page["version"])
         return {
             "message": "Sections reordered successfully",
             "page_id": page_id,
@@ -298,6 +653,8 @@ async def reorder_sections(page_id: str, request: ReorderSectionsRequest):
         
     except HTTPException:
         raise
+    except VersionConflictError as e:
+        raise _conflict(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -305,6 +662,142 @@ async def reorder_sections(page_id: str, request: ReorderSectionsRequest):
         )
 
 
+@router.get("/pages/{page_id}/versions", response_model=list)
+async def list_versions(
+    page_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = None
+):
+    """
+    List a page's stored versions, newest first
+    
+    Args:
+        page_id: The page ID
+        limit: Maximum number of versions to return
+        before: Only list versions older than this one, to page through history
+    
+    Returns:
+        list: Version summaries
+    """
+    try:
+        versions = await list_page_versions(page_id, limit=limit, before=before)
+        
+        if not versions and not await page_exists(page_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Page {page_id} not found"
+            )
+        
+        return [{
+            "version": version["version"],
+            "kind": version["kind"],
+            "createdAt": version["created_at"].isoformat() if version.get("created_at") else None
+        } for version in versions]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list versions: {str(e)}"
+        )
+
+
+@router.get("/pages/{page_id}/versions/{version}")
+async def get_version(page_id: str, version: int):
+    """
+    Retrieve the sections of one stored page version
+    
+    Args:
+        page_id: The page ID
+        version: The version to rebuild
+    
+    Returns:
+        dict: Version number, creation time and sections
+    """
+    try:
+        page_version = await get_page_version(page_id, version)
+        
+        if not page_version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Version {version} of page {page_id} not found"
+            )
+        
+        return {
+            "pageId": page_id,
+            "version": page_version["version"],
+            "createdAt": page_version["created_at"].isoformat() if page_version.get("created_at") else None,
+            "sections": page_version["sections"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve version: {str(e)}"
+        )
+
+
+@router.post("/pages/{page_id}/rollback")
+async def rollback_page(
+    page_id: str,
+    request: RollbackRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """
+    Restore the sections of an earlier version
+    
+    The restored sections are written as a new version, so the rollback
+    itself stays in the history and can be undone.
+    
+    Args:
+        page_id: The page ID
+        request: Version to restore
+        if_match: Optional ETag of the version being replaced (409 if stale)
+    
+    Returns:
+        dict: New version number
+    """
+    try:
+        expected_version = _expected_version(if_match, request.expected_version)
+        
+        page_version = await get_page_version(page_id, request.version)
+        if not page_version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Version {request.version} of page {page_id} not found"
+            )
+        
+        updated_page = await update_page(page_id, page_version["sections"], expected_version)
+        
+        if not updated_page:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Page {page_id} not found"
+            )
+        
+        response.headers["ETag"] = _etag(updated_page["version"])
+        return {
+            "message": f"Page rolled back to version {request.version}",
+            "page_id": page_id,
+            "restored_version": request.version,
+            "version": updated_page["version"]
+        }
+        
+    except HTTPException:
+        raise
+    except VersionConflictError as e:
+        raise _conflict(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to roll back page: {str(e)}"
+        )
+
+
 @router.post("/pages/{page_id}/publish", response_model=PublishResponse)
 async def publish_landing_page(page_id: str):
     """
@@ -317,7 +810,7 @@ async def publish_landing_page(page_id: str):
         PublishResponse: Confirmation and preview URL
     """
     try:
-        page = get_page(page_id)
+        page = await get_page(page_id, include_context=False)
         
         if not page:
             raise HTTPException(
@@ -326,13 +819,19 @@ async def publish_landing_page(page_id: str):
             )
         
         # Publish
-        published_page = publish_page(page_id)
+        published_page = await publish_page(page_id)
+        
+        # Write the immutable snapshot that public traffic is served from
+        snapshot = await asyncio.to_thread(build_snapshot, published_page)
+        await save_published_snapshot(snapshot)
+        remember_snapshot(snapshot)
         
         return PublishResponse(
             page_id=page_id,
             version=published_page["version"],
             url=f"/preview/{page_id}",
-            message="Page published successfully"
+            message="Page published successfully",
+            snapshot_url=f"/api/published/{page_id}/v/{published_page['version']}"
         )
         
     except HTTPException:
@@ -356,7 +855,8 @@ async def delete_landing_page(page_id: str):
         dict: Confirmation
     """
     try:
-        success = delete_page(page_id)
+        success = await delete_page(page_id)
+        forget_snapshots(page_id)
         
         if not success:
             raise HTTPException(
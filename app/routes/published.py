@@ -0,0 +1,134 @@
+from fastapi import APIRouter, HTTPException, Header, Query, Response, status
+from app.db import get_published_snapshot
+from app.snapshots import (
+    ARTIFACT_MEDIA_TYPES,
+    LATEST_VERSION_TTL_SECONDS,
+    snapshot_cache,
+    latest_versions,
+    choose_encoding
+)
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# A versioned snapshot never changes, so it can be cached anywhere for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+async def _load_snapshot(page_id: str, version: Optional[int]) -> Optional[dict]:
+    """Find a snapshot in the worker cache, falling back to the snapshot store"""
+    if version is None:
+        version = latest_versions.get(page_id)
+
+    if version is not None:
+        snapshot = snapshot_cache.get((page_id, version))
+        if snapshot:
+            return snapshot
+
+    snapshot = await get_published_snapshot(page_id, version)
+    if snapshot:
+        snapshot_cache.set((page_id, snapshot["version"]), snapshot)
+        # An old immutable URL must not become the page's latest version
+        latest = latest_versions.get(page_id)
+        if version is None or (latest is not None and snapshot["version"] > latest):
+            latest_versions.set(page_id, snapshot["version"])
+    return snapshot
+
+
+def _serve(snapshot: dict, format: str, accept_encoding: Optional[str], if_none_match: Optional[str], cache_control: str) -> Response:
+    """Send a pre-compressed artifact as-is, negotiating the content encoding"""
+    artifacts = snapshot["artifacts"][format]
+    encoding = choose_encoding(accept_encoding, artifacts)
+
+    etag = f'"{snapshot["page_id"]}-v{snapshot["version"]}-{format}-{encoding}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=artifacts[encoding], media_type=ARTIFACT_MEDIA_TYPES[format], headers=headers)
+
+
+@router.get("/published/{page_id}")
+async def get_latest_published_page(
+    page_id: str,
+    format: str = Query("html", pattern="^(html|json)$"),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Serve the latest published snapshot of a page
+
+    Args:
+        page_id: The page ID
+        format: "html" for the rendered page, "json" for the section spec
+
+    Returns:
+        Response: Pre-rendered artifact, briefly cacheable
+    """
+    try:
+        snapshot = await _load_snapshot(page_id, None)
+
+        if not snapshot:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Page {page_id} is not published"
+            )
+
+        return _serve(snapshot, format, accept_encoding, if_none_match, f"public, max-age={LATEST_VERSION_TTL_SECONDS}")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to load published page: {str(e)}"
+        )
+
+
+@router.get("/published/{page_id}/v/{version}")
+async def get_published_page_version(
+    page_id: str,
+    version: int,
+    format: str = Query("html", pattern="^(html|json)$"),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Serve one immutable published version of a page
+
+    Args:
+        page_id: The page ID
+        version: The published version
+        format: "html" for the rendered page, "json" for the section spec
+
+    Returns:
+        Response: Pre-rendered artifact with long-lived cache headers
+    """
+    try:
+        snapshot = await _load_snapshot(page_id, version)
+
+        if not snapshot:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Version {version} of page {page_id} is not published"
+            )
+
+        return _serve(snapshot, format, accept_encoding, if_none_match, IMMUTABLE_CACHE_CONTROL)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to load published page: {str(e)}"
+        )
@@ -0,0 +1,93 @@
+# snapshots.py
+import os
+import gzip
+import json
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.cache import TTLCache
+from app.render import render_page_html
+
+try:
+    import brotli
+except ImportError:  # optional, published pages are then served gzip only
+    brotli = None
+
+SNAPSHOT_CACHE_MAX_ENTRIES = int(os.getenv("SNAPSHOT_CACHE_MAX_ENTRIES", "256"))
+# How long a worker trusts its idea of a page's latest published version
+LATEST_VERSION_TTL_SECONDS = int(os.getenv("LATEST_VERSION_TTL_SECONDS", "60"))
+
+ARTIFACT_MEDIA_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "json": "application/json",
+}
+
+# Snapshots never change once written, so they only leave the cache by LRU
+snapshot_cache = TTLCache(max_size=SNAPSHOT_CACHE_MAX_ENTRIES, ttl_seconds=None)
+latest_versions = TTLCache(max_size=SNAPSHOT_CACHE_MAX_ENTRIES * 4, ttl_seconds=LATEST_VERSION_TTL_SECONDS)
+
+
+def _encodings(body: bytes) -> Dict[str, bytes]:
+    """Pre-compress an artifact in every supported content encoding"""
+    encoded = {
+        "identity": body,
+        # mtime=0 keeps the bytes, and so the ETag, deterministic
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    return encoded
+
+
+def build_snapshot(page: dict) -> dict:
+    """Build the immutable published snapshot for one page version"""
+    page_id = page["page_id"]
+    version = page["version"]
+    sections = page.get("sections", [])
+
+    json_body = json.dumps(
+        {"pageId": page_id, "version": version, "sections": sections},
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    html_body = render_page_html(page_id, sections).encode("utf-8")
+
+    return {
+        "_id": f"{page_id}:{version}",
+        "page_id": page_id,
+        "version": version,
+        "published_at": datetime.utcnow(),
+        "sections": sections,
+        "artifacts": {
+            "json": _encodings(json_body),
+            "html": _encodings(html_body),
+        },
+    }
+
+
+def remember_snapshot(snapshot: dict) -> None:
+    """Cache a snapshot and mark it as the latest published version"""
+    snapshot_cache.set((snapshot["page_id"], snapshot["version"]), snapshot)
+    latest_versions.set(snapshot["page_id"], snapshot["version"])
+
+
+def forget_snapshots(page_id: str) -> None:
+    """Stop serving a deleted page from this worker's cache"""
+    version = latest_versions.pop(page_id)
+    if version is not None:
+        snapshot_cache.pop((page_id, version))
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Dict[str, bytes]) -> str:
+    """Pick the best pre-compressed artifact the client accepts"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
@@ -0,0 +1,168 @@
+# transfer.py
+import os
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+from app.db import (
+    iter_pages,
+    get_brand_context,
+    brand_context_ref,
+    upsert_brand_contexts,
+    upsert_pages
+)
+
+logger = logging.getLogger(__name__)
+
+# Pages per Mongo cursor batch on export and per bulk_write on import
+TRANSFER_BATCH_SIZE = int(os.getenv("TRANSFER_BATCH_SIZE", "500"))
+# A longer import line is rejected rather than buffered
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(4 * 1024 * 1024)))
+# Only the first few bad lines are reported back
+IMPORT_MAX_REPORTED_ERRORS = 20
+
+PAGE_DATE_FIELDS = ("created_at", "updated_at")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_record(record: dict) -> bytes:
+    """One NDJSON line"""
+    return (json.dumps(record, default=_json_default, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def export_records(user_id: Optional[str] = None, batch_size: int = TRANSFER_BATCH_SIZE) -> AsyncIterator[dict]:
+    """
+    Yield every matching page as an export record, streamed from a cursor
+
+    Each brand context is written once, as a "brand_context" record just
+    before the first page that references it, so pages stay small.
+    """
+    exported_refs = set()
+
+    async for page in iter_pages(user_id, batch_size):
+        ref = page.get("context_ref")
+        if ref and ref not in exported_refs:
+            exported_refs.add(ref)
+            brand_context = await get_brand_context(ref)
+            if brand_context:
+                yield {
+                    "kind": "brand_context",
+                    "ref": ref,
+                    "context": brand_context["context"],
+                    "url": brand_context.get("url"),
+                    "crawled_at": brand_context.get("crawled_at")
+                }
+
+        yield {"kind": "page", **page}
+
+
+def _parse_date(value) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _brand_context_document(record: dict) -> dict:
+    context = record.get("context")
+    if not isinstance(context, str) or not context:
+        raise ValueError("brand_context record has no context")
+    if record.get("ref") != brand_context_ref(context):
+        raise ValueError("brand_context ref does not match its content")
+
+    now = datetime.utcnow()
+    return {
+        "_id": record["ref"],
+        "context": context,
+        "url": record.get("url"),
+        "crawled_at": _parse_date(record.get("crawled_at")) or now,
+        "created_at": now
+    }
+
+
+def _page_document(record: dict) -> dict:
+    page = {key: value for key, value in record.items() if key not in ("kind", "_id")}
+    if not isinstance(page.get("page_id"), str) or not page["page_id"]:
+        raise ValueError("page record has no page_id")
+    if not isinstance(page.get("sections"), list):
+        raise ValueError("page record has no sections list")
+
+    page.setdefault("version", 1)
+    version = page["version"]
+    if not isinstance(version, int) or isinstance(version, bool) or version < 1:
+        raise ValueError(f"page record has an invalid version {version!r}")
+    for field in PAGE_DATE_FIELDS:
+        page[field] = _parse_date(page.get(field)) or datetime.utcnow()
+    return page
+
+
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed body into lines, holding at most one partial line"""
+    buffer = b""
+    async for chunk in body:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            raise ValueError(f"Import line longer than {IMPORT_MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield buffer
+
+
+async def import_records(body: AsyncIterator[bytes], batch_size: int = TRANSFER_BATCH_SIZE) -> Dict:
+    """
+    Upsert pages and brand contexts from a streamed NDJSON export
+
+    Records are written in bulk batches as they are parsed. Pages are
+    matched on page_id and replaced, moving past their current version;
+    existing brand contexts are kept.
+    Bad lines are skipped and reported by line number.
+
+    Returns:
+        dict: counts of pages and brand contexts written, and skipped lines
+    """
+    summary = {"pages": 0, "brand_contexts": 0, "skipped": 0, "errors": []}
+    contexts = []
+    # By page_id: a page repeated within a batch is written once, last record wins
+    pages = {}
+
+    async def flush():
+        # Contexts first so every written page can resolve its reference
+        summary["brand_contexts"] += await upsert_brand_contexts(contexts)
+        summary["pages"] += await upsert_pages(list(pages.values()))
+        contexts.clear()
+        pages.clear()
+
+    line_number = 0
+    async for line in _lines(body):
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+            kind = record.get("kind", "page") if isinstance(record, dict) else None
+            if kind == "brand_context":
+                contexts.append(_brand_context_document(record))
+            elif kind == "page":
+                page = _page_document(record)
+                pages.pop(page["page_id"], None)
+                pages[page["page_id"]] = page
+            else:
+                raise ValueError(f"unknown record kind {kind!r}")
+        except ValueError as e:
+            summary["skipped"] += 1
+            if len(summary["errors"]) < IMPORT_MAX_REPORTED_ERRORS:
+                summary["errors"].append({"line": line_number, "error": str(e)})
+            continue
+
+        if len(contexts) + len(pages) >= batch_size:
+            await flush()
+
+    await flush()
+    logger.info(f"Imported {summary['pages']} pages, {summary['brand_contexts']} new brand contexts, skipped {summary['skipped']} lines")
+    return summary
@@ -2,7 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import app  # This imports app/__init__.py which loads .env
 from app.routes.pages import router as pages_router
+from app.routes.published import router as published_router
+from app.routes.jobs import router as jobs_router
 from app.db import init_db
+from app.llm.generator import crawler, page_spec_cache
+from app.llm.limiter import llm_limiter
+from app.llm.usage import llm_usage
+from app.jobs import job_queue
 import os
 
 app = FastAPI(title="AI Landing Page Builder")
@@ -27,20 +33,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Location"],
 )
 
 # Initialize DB
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    await init_db()
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop()
+    await crawler.aclose()
 
 # Include routes
 app.include_router(pages_router, prefix="/api", tags=["pages"])
+app.include_router(published_router, prefix="/api", tags=["published"])
+app.include_router(jobs_router, prefix="/api", tags=["jobs"])
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "llm_usage": llm_usage.stats(),
+        "llm_limiter": llm_limiter.stats(),
+        "page_spec_cache": page_spec_cache.stats(),
+        "crawl_cache": crawler.cache.stats() if crawler.cache else None
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os
+import copy
+import asyncio
+from datetime import datetime, timedelta
+
+# app.db and the LLM client read these at import time; no connection is made
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("AZURE_ENDPOINT", "https://example.openai.azure.com")
+os.environ.setdefault("AZURE_API_KEY", "test")
+
+import pytest
+
+from app import jobs
+from app.jobs import JobQueue
+from app.llm.limiter import LLMOverloadedError
+
+
+class FakeJobStore:
+    """In-memory stand-in for the jobs collection functions app.jobs uses"""
+
+    def __init__(self):
+        self.jobs = {}
+
+    async def create_job(self, job):
+        self.jobs[job["job_id"]] = copy.deepcopy(job)
+        return job
+
+    async def claim_job(self, job_id, lease_seconds):
+        job = self.jobs.get(job_id)
+        if not job or job["status"] != "queued":
+            return None
+        now = datetime.utcnow()
+        job.update({
+            "status": "running",
+            "started_at": now,
+            "lease_until": now + timedelta(seconds=lease_seconds),
+            "attempts": job["attempts"] + 1
+        })
+        return copy.deepcopy(job)
+
+    async def renew_job_lease(self, job_id, lease_seconds):
+        job = self.jobs.get(job_id)
+        if not job or job["status"] != "running":
+            return False
+        job["lease_until"] = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        return True
+
+    async def update_job(self, job_id, fields):
+        self.jobs[job_id].update(fields)
+
+    async def release_job(self, job_id, fields):
+        job = self.jobs[job_id]
+        job.update({**fields, "status": "queued", "lease_until": None})
+        job["attempts"] -= 1
+
+    async def requeue_expired_jobs(self, now):
+        requeued = []
+        for job in self.jobs.values():
+            if job["status"] == "running" and not (job.get("lease_until") and job["lease_until"] >= now):
+                job.update({"status": "queued", "lease_until": None})
+                requeued.append(job["job_id"])
+        return requeued
+
+    async def queued_jobs(self):
+        return [job["job_id"] for job in sorted(self.jobs.values(), key=lambda job: job["created_at"]) if job["status"] == "queued"]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeJobStore()
+    for name in ("create_job", "claim_job", "renew_job_lease", "update_job", "release_job", "requeue_expired_jobs", "queued_jobs"):
+        monkeypatch.setattr(jobs, name, getattr(store, name))
+    return store
+
+
+async def _wait_for(store, job_id, statuses, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while store.jobs[job_id]["status"] not in statuses:
+        assert asyncio.get_running_loop().time() < deadline, f"job stuck in {store.jobs[job_id]['status']}"
+        await asyncio.sleep(0.01)
+    return store.jobs[job_id]
+
+
+def test_job_runs_with_fake_runner(store):
+    async def runner(payload, timings):
+        timings["generate_ms"] = 5
+        return {"pageId": f"page-{payload['offer']}", "version": 1}
+
+    async def scenario():
+        queue = JobQueue(runner=runner, workers=2)
+        await queue.start()
+        try:
+            job = await queue.submit({"offer": "demo"})
+            return await _wait_for(store, job["job_id"], {"succeeded", "failed"})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"pageId": "page-demo", "version": 1}
+    assert job["attempts"] == 1
+    assert "queued_ms" in job["timings"] and job["timings"]["generate_ms"] == 5
+
+
+def test_failing_runner_marks_job_failed(store):
+    async def runner(payload, timings):
+        raise RuntimeError("model returned nothing")
+
+    async def scenario():
+        queue = JobQueue(runner=runner, workers=1)
+        await queue.start()
+        try:
+            job = await queue.submit({"offer": "demo"})
+            return await _wait_for(store, job["job_id"], {"succeeded", "failed"})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed"
+    assert job["error"] == "model returned nothing"
+
+
+def test_overload_deferrals_do_not_use_up_attempts(store):
+    calls = []
+
+    async def runner(payload, timings):
+        calls.append(payload)
+        if len(calls) <= 4:
+            raise LLMOverloadedError("LLM capacity exhausted", retry_after=0.01)
+        return {"pageId": "page-deferred", "version": 1}
+
+    async def scenario():
+        # One worker, so deferred jobs must not keep it busy while they wait
+        queue = JobQueue(runner=runner, workers=1, max_attempts=3)
+        await queue.start()
+        try:
+            job = await queue.submit({"offer": "demo"})
+            return await _wait_for(store, job["job_id"], {"succeeded", "failed"})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert len(calls) == 5
+    assert job["attempts"] == 1
+
+
+def test_deferred_job_frees_its_worker(store):
+    started = []
+
+    async def runner(payload, timings):
+        started.append(payload["offer"])
+        if payload["offer"] == "busy" and started.count("busy") == 1:
+            raise LLMOverloadedError("LLM capacity exhausted", retry_after=0.3)
+        return {"pageId": f"page-{payload['offer']}", "version": 1}
+
+    async def scenario():
+        queue = JobQueue(runner=runner, workers=1)
+        await queue.start()
+        try:
+            deferred = await queue.submit({"offer": "busy"})
+            await asyncio.sleep(0.05)
+            other = await queue.submit({"offer": "other"})
+            # Finishes while the first job is still waiting out its Retry-After
+            await _wait_for(store, other["job_id"], {"succeeded"}, timeout=0.2)
+            return await _wait_for(store, deferred["job_id"], {"succeeded", "failed"})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert started == ["busy", "other", "busy"]
+
+
+def test_long_job_keeps_its_lease(store):
+    async def runner(payload, timings):
+        # Several lease periods long, so only renewals keep it from being requeued
+        await asyncio.sleep(0.5)
+        return {"pageId": "page-slow", "version": 1}
+
+    async def scenario():
+        queue = JobQueue(runner=runner, workers=1, lease_seconds=0.15)
+        await queue.start()
+        try:
+            job = await queue.submit({"offer": "slow"})
+            return await _wait_for(store, job["job_id"], {"succeeded", "failed"})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
+
+
+def test_job_orphaned_by_a_crash_is_requeued(store):
+    async def runner(payload, timings):
+        return {"pageId": "page-recovered", "version": 1}
+
+    # Left running by a worker that died moments ago; its lease has not lapsed yet
+    now = datetime.utcnow()
+    store.jobs["job-orphan"] = {
+        "job_id": "job-orphan",
+        "status": "running",
+        "payload": {"offer": "demo"},
+        "created_at": now - timedelta(seconds=1),
+        "started_at": now - timedelta(seconds=1),
+        "lease_until": now + timedelta(seconds=0.2),
+        "attempts": 1,
+        "timings": {},
+        "result": None,
+        "error": None
+    }
+
+    async def scenario():
+        queue = JobQueue(runner=runner, workers=1, lease_seconds=0.2)
+        await queue.start()
+        try:
+            assert store.jobs["job-orphan"]["status"] == "running"
+            return await _wait_for(store, "job-orphan", {"succeeded", "failed"})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"pageId": "page-recovered", "version": 1}
+    assert job["attempts"] == 2